@@ -1,13 +1,15 @@
 # bot.py
 import asyncio
+import hashlib
 import os
 import random
 import re
 import shutil
 import time
 import uuid
+from contextlib import aclosing
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
 
 from pyrogram import Client, filters, enums, idle
 from pyrogram.types import (
@@ -28,19 +30,61 @@ from database import (
     get_all_users,
     register_temp_path,
     update_user_stats,
+    flush_db_writes,
+    db_write_stats,
 )
-from utils.progress import progress_for_pyrogram, human_bytes
-from utils.extractors import extract_archive, detect_encrypted
+from utils.progress import (
+    progress_for_pyrogram,
+    human_bytes,
+    human_time,
+    close_progress,
+    transfer_stats,
+)
+from utils.edit_dispatcher import edit_dispatcher
+from utils.extractors import detect_encrypted
 from utils.link_parser import (
     find_links_in_text,
     extract_links_from_folder,
     classify_link,
 )
 from utils.cleanup import cleanup_worker
-from utils.media_tools import extract_audio, generate_thumbnail
+from utils.executor import (
+    run_extract,
+    run_list,
+    iter_extract,
+    shutdown_extract_pools,
+    ExtractionCancelled,
+)
+from utils.extractors import WrongPassword
+from utils.media_tools import extract_audio, ffmpeg_stats
+from utils.media_info import video_upload_kwargs, prewarm_video, media_cache_stats
+from utils.http_client import start_http_client, close_http_client
 from utils.http_downloader import download_file
-from utils.m3u8_tools import get_m3u8_variants, download_m3u8_stream
+from utils.tg_downloader import download_media_parallel, DownloadCancelled
+from utils.m3u8_tools import get_m3u8_variants, download_m3u8_stream, playlist_cache_stats
 from utils.gdrive import get_gdrive_direct_link
+from utils.upload_pool import UploadPool
+from utils.task_progress import TaskProgress
+from utils.client_pool import client_pool
+from utils.file_cache import (
+    content_hash,
+    note_hash,
+    prehash,
+    send_cached,
+    send_file_id,
+    media_of,
+    remember,
+    file_cache_stats,
+)
+from utils.archive_cache import (
+    archive_cache,
+    cache_key as archive_cache_key,
+    cached_outputs,
+    is_complete,
+    record_output,
+)
+from utils.splitter import needs_split, split_for_upload
+from utils.scheduler import scheduler, RES_NET, RES_DISK, RES_CPU
 
 
 # ----------------- Pyrogram client -----------------
@@ -51,10 +95,12 @@ app = Client(
     api_hash=Config.API_HASH,
     bot_token=Config.BOT_TOKEN,
     in_memory=True,
+    max_concurrent_transmissions=Config.TG_MAX_TRANSMISSIONS,
 )
+client_pool.set_main(app)
 
 # in‑memory state
-user_locks: Dict[int, asyncio.Lock] = {}
+background_tasks: Set[asyncio.Task] = set()
 tasks: Dict[str, Dict[str, Any]] = {}        # unzip tasks & meta
 pending_password: Dict[int, Dict[str, Any]] = {}
 user_cancelled: Dict[int, bool] = {}
@@ -87,10 +133,41 @@ user_thumb_mode: Dict[int, str] = {}  # user_id -> mode
 LINK_SESSIONS: Dict[Tuple[int, int], Dict[str, Any]] = {}
 
 
-def get_lock(user_id: int) -> asyncio.Lock:
-    if user_id not in user_locks:
-        user_locks[user_id] = asyncio.Lock()
-    return user_locks[user_id]
+def spawn(coro) -> asyncio.Task:
+    """
+    Long job ko background task bana do, taaki scheduler queue me wait
+    karte hue pyrogram ke handler workers block na ho.
+    """
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+def job_slot(user_id: int, resources: Tuple[str, ...], status_msg: Message):
+    """Global scheduler slot; queue position status_msg pe dikhaata hai."""
+    premium = is_premium_user(user_id)
+
+    async def _on_position(pos: int):
+        note = "Premium priority ✅" if premium else "Premium users ko priority milti hai."
+        await status_msg.edit_text(
+            f"⏳ Server busy hai, tum queue me ho: <b>#{pos}</b>\n{note}"
+        )
+
+    return scheduler.slot(user_id, resources, premium=premium, on_position=_on_position)
+
+
+async def link_work_dir(user_id: int, url: str) -> Path:
+    """
+    Har link ka fixed folder (URL hash), taaki fail / bot restart ke baad
+    same link dobara bhejne par .part checkpoint se resume ho sake.
+    Har use pe TTL refresh, warna resume ke beech cleanup folder uda deta.
+    """
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    path = Path(Config.TEMP_DIR) / str(user_id) / "links" / key
+    path.mkdir(parents=True, exist_ok=True)
+    await register_temp_path(user_id, str(path), Config.AUTO_DELETE_DEFAULT_MIN)
+    return path
 
 
 def is_owner(user_id: int) -> bool:
@@ -262,6 +339,15 @@ async def log_user_input(client: Client, message: Message, context: str):
         pass
 
 
+def output_log_caption(user, context: str) -> str:
+    return (
+        f"✅ <b>OUTPUT</b>\n"
+        f"• User: <b>{user.first_name or ''}</b> (@{user.username or 'N/A'})\n"
+        f"• ID: <code>{user.id}</code>\n"
+        f"• Context: <code>{context}</code>"
+    )
+
+
 async def log_user_output(client: Client, user, msg: Message, context: str):
     if not Config.LOG_CHANNEL_ID or not user or not msg:
         return
@@ -270,12 +356,7 @@ async def log_user_output(client: Client, user, msg: Message, context: str):
     if not chat_id:
         return
 
-    cap = (
-        f"✅ <b>OUTPUT</b>\n"
-        f"• User: <b>{user.first_name or ''}</b> (@{user.username or 'N/A'})\n"
-        f"• ID: <code>{user.id}</code>\n"
-        f"• Context: <code>{context}</code>"
-    )
+    cap = output_log_caption(user, context)
     if msg.caption:
         cap += f"\n\n{msg.caption}"
 
@@ -359,21 +440,22 @@ def build_caption(user_id: int, default_caption: str) -> str:
     return caption
 
 
-async def choose_thumbnail(user_id: int, video_path: str) -> Optional[str]:
+async def video_send_kwargs(user_id: int, video_path: str) -> Dict[str, Any]:
     """
-    Choose thumbnail for a local video file based on user setting.
+    send_video ke extra args (thumb + duration/width/height) user ke thumb mode se.
     'original'  -> frame from the very start (00:00:00.200)
     'random'    -> frame from a bit later (00:00:02)
+    Same content dobara bheja jaye to ffprobe / ffmpeg cache se skip.
     """
-    mode = get_thumb_mode(user_id)
-    time_pos = "00:00:00.200" if mode == "original" else "00:00:02"
-
-    thumb_path = video_path + ".jpg"
     try:
-        await generate_thumbnail(video_path, thumb_path, time_pos=time_pos)
-        return thumb_path
+        return await video_upload_kwargs(video_path, thumb_time_pos(user_id))
     except Exception:
-        return None
+        return {}
+
+
+def thumb_time_pos(user_id: int) -> str:
+    mode = get_thumb_mode(user_id)
+    return "00:00:00.200" if mode == "original" else "00:00:02"
 
 
 # ----------------- basic helpers -----------------
@@ -655,6 +737,14 @@ async def status_cmd(client: Client, message: Message):
         return
 
     total, premium, banned = await count_users()
+    pc = playlist_cache_stats()
+    fs = ffmpeg_stats()
+    ms = media_cache_stats()
+    fc = file_cache_stats()
+    ac = archive_cache.stats()
+    ed = edit_dispatcher.stats
+    ts = transfer_stats()
+    dw = db_write_stats()
 
     total_b = used_b = free_b = 0
     try:
@@ -670,7 +760,27 @@ async def status_cmd(client: Client, message: Message):
         f"Banned: <b>{banned}</b>\n\n"
         f"Disk total: <code>{human_bytes(total_b)}</code>\n"
         f"Disk used: <code>{human_bytes(used_b)}</code>\n"
-        f"Disk free: <code>{human_bytes(free_b)}</code>\n"
+        f"Disk free: <code>{human_bytes(free_b)}</code>\n\n"
+        f"m3u8 cache: <code>{pc['entries']}</code> playlists | "
+        f"hit {pc['hits']} / miss {pc['misses']} / 304 {pc['revalidated']}\n"
+        f"ffmpeg: running <code>{fs['running']}</code> | queued <code>{fs['queued']}</code> | "
+        f"jobs {int(fs['jobs'])} (fail {int(fs['failed'])}, cancel {int(fs['cancelled'])})\n"
+        f"ffmpeg time: cpu <code>{human_time(int(fs['cpu_sec']))}</code> / "
+        f"wall <code>{human_time(int(fs['wall_sec']))}</code>\n"
+        f"media cache: probe hit {ms['hits']} / miss {ms['misses']} | "
+        f"thumb hit {ms['thumb_hits']} / miss {ms['thumb_misses']}\n"
+        f"file_id cache: hit {fc['hits']} / miss {fc['misses']} / stale {fc['stale']}\n"
+        f"archive cache: <code>{ac['entries']}</code> | hit {ac['hits']} / miss {ac['misses']}\n"
+        f"transfers: <code>{ts['active']}</code> live | "
+        f"{human_bytes(int(ts['speed']))}/s | left {human_bytes(ts['bytes_left'])}\n"
+        f"db writes: queued {dw['queued']} / written {dw['written']} / failed {dw['failed']} in {dw['flushes']} flushes\n"
+        f"progress edits: sent {ed['sent']} / merged {ed['merged']} / "
+        f"unchanged {ed['unchanged']} / flood {ed['flood']} | pending {edit_dispatcher.pending()}\n"
+        f"upload bots: "
+        + " | ".join(
+            f"#{b['index']} active {b['active']} / done {b['done']}" for b in client_pool.stats()
+        )
+        + "\n"
     )
     await message.reply_text(txt)
 
@@ -1106,18 +1216,18 @@ async def callbacks(client: Client, cq: CallbackQuery):
         except Exception:
             await cq.answer("Original video nahi mila.", show_alert=True)
             return
-        await handle_extract_audio(client, cq, original_msg)
+        spawn(handle_extract_audio(client, cq, original_msg))
         return
 
     # send all/single extracted
     if data.startswith("sendall|"):
         _, task_id = data.split("|", 1)
-        await handle_send_all(client, cq, task_id)
+        spawn(handle_send_all(client, cq, task_id))
         return
 
     if data.startswith("sendone|"):
         _, task_id, index = data.split("|", 2)
-        await handle_send_one(client, cq, task_id, int(index))
+        spawn(handle_send_one(client, cq, task_id, int(index)))
         return
 
     # links actions
@@ -1144,7 +1254,7 @@ async def callbacks(client: Client, cq: CallbackQuery):
             await cq.message.edit_text("<b>Cleaned URLs:</b>\n\n" + txt[:4000])
         elif action == "download_all":
             await cq.answer()
-            await handle_links_download_all(client, cq, original_msg)
+            spawn(handle_links_download_all(client, cq, original_msg))
         else:
             await cq.answer()
             await cq.message.edit_text("Skipped link processing.")
@@ -1158,7 +1268,7 @@ async def callbacks(client: Client, cq: CallbackQuery):
         except Exception:
             await cq.answer("Invalid selection.", show_alert=True)
             return
-        await handle_m3u8_quality_choice(client, cq, task_id, index)
+        spawn(handle_m3u8_quality_choice(client, cq, task_id, index))
         return
 
     await cq.answer()
@@ -1204,7 +1314,7 @@ async def handle_unzip_button(
         return
 
     await cq.answer()
-    await run_unzip_task(client, original_msg, password=None)
+    spawn(run_unzip_task(client, original_msg, password=None))
 
 
 async def handle_unzip_from_password(
@@ -1214,23 +1324,21 @@ async def handle_unzip_from_password(
     msg_id = info["msg_id"]
     original_msg = await client.get_messages(chat_id, msg_id)
     await msg.reply_text("Got the password, starting extraction…")
-    await run_unzip_task(client, original_msg, password=password)
+    spawn(run_unzip_task(client, original_msg, password=password))
 
 
 async def run_unzip_task(client: Client, msg: Message, password: Optional[str]):
     if not msg.from_user:
         return
     user_id = msg.from_user.id
-    lock = get_lock(user_id)
+    user_cancelled[user_id] = False
+    status_msg = await msg.reply_text("Task queue me add ho gaya… ⏳")
 
-    if lock.locked():
-        await msg.reply_text(
-            "Chill, ek task already running hai. Pehle usko finish hone do."
-        )
-        return
+    async with job_slot(user_id, (RES_NET, RES_DISK), status_msg):
+        if user_cancelled.get(user_id):
+            await status_msg.edit_text("Task cancel kar diya ✅")
+            return
 
-    async with lock:
-        user_cancelled[user_id] = False
         doc = msg.document
         file_name = doc.file_name or "archive"
         size_bytes = doc.file_size or 0
@@ -1243,22 +1351,53 @@ async def run_unzip_task(client: Client, msg: Message, password: Optional[str]):
 
         await register_temp_path(user_id, str(temp_root), Config.AUTO_DELETE_DEFAULT_MIN)
 
-        status_msg = await msg.reply_text("Downloading archive to server…")
+        # same archive (+ same password) pehle process ho chuka -> seedha menu
+        cache_key = archive_cache_key(doc.file_unique_id, password)
+        manifest = archive_cache.get(cache_key)
+        if manifest:
+            try:
+                await log_user_input(client, msg, f"archive (cached): {file_name}")
+            except Exception:
+                pass
+            task_id = uuid.uuid4().hex
+            tasks[task_id] = {
+                "type": "unzip",
+                "user_id": user_id,
+                "base_dir": str(temp_root / "extracted"),
+                "files": manifest["files"],
+                "sizes": manifest["sizes"],
+                "archive_name": manifest["archive_name"],
+                "archive_path": None,  # zarurat padi to ensure_archive()
+                "password": password,
+                "cache_key": cache_key,
+                "source_doc": doc,
+                "temp_root": str(temp_root),
+            }
+            text, kb = archive_menu(task_id, manifest, cached=True)
+            await status_msg.edit_text(text, reply_markup=kb)
+            await update_user_stats(user_id, size_mb)
+            return
 
-        start = time.time()
+        # ek hi status message: download -> scan, phir wahi menu ban jata hai
+        tp = TaskProgress(status_msg, file_name, [("Download", 1.0), ("Scan", 0.1)])
+        await tp.note("Downloading archive to server…")
         try:
-            downloaded_path = await client.download_media(
+            downloaded_path = await download_media_parallel(
+                client,
                 doc,
-                file_name=str(temp_root),
-                progress=progress_for_pyrogram,
-                progress_args=(status_msg, start, file_name, "to my server"),
+                str(temp_root),
+                progress=tp.callback("Download"),
+                cancel_check=lambda: user_cancelled.get(user_id, False),
             )
+        except DownloadCancelled:
+            await tp.finish("Task cancel kar diya ✅")
+            return
         except Exception as e:
-            await status_msg.edit_text(f"Download fail ho gaya:\n<code>{e}</code>")
+            await tp.finish(f"Download fail ho gaya:\n<code>{e}</code>")
             return
 
         if not downloaded_path:
-            await status_msg.edit_text("Download hua nahi, file path missing hai.")
+            await tp.finish("Download hua nahi, file path missing hai.")
             return
 
         archive_path = downloaded_path
@@ -1269,34 +1408,73 @@ async def run_unzip_task(client: Client, msg: Message, password: Optional[str]):
             pass
 
         if user_cancelled.get(user_id):
-            await status_msg.edit_text("Task cancel kar diya ✅")
+            await tp.finish("Task cancel kar diya ✅")
             return
 
         if not password and detect_encrypted(archive_path):
-            await status_msg.edit_text(
+            await tp.finish(
                 "Archive password protected lag rahi hai.\n"
                 "Use 'With Password' button & try again."
             )
             return
 
-        await status_msg.edit_text("Extraction shuru… Thoda sabr 😎")
+        tp.complete("Download")
+        await tp.note("Archive scan ho rahi hai… 🔍")
         extract_dir = temp_root / "extracted"
         try:
-            result = extract_archive(archive_path, str(extract_dir), password=password)
+            listing = await run_list(archive_path, password=password)
+        except WrongPassword as e:
+            # galat password wala manifest cache me nahi jata
+            await tp.finish(f"{e}\nUse 'With Password' button & try again.")
+            return
         except Exception as e:
-            await status_msg.edit_text(f"Extract error:\n<code>{e}</code>")
+            await tp.finish(f"Extract error:\n<code>{e}</code>")
             return
 
+        stats = listing["stats"]
+        files = sorted(listing["files"], key=lambda p: p.lower())
+
+        # link parsing ke liye sirf TXT / M3U files nikaalo, baaki on demand
+        link_sources = [
+            f for f in files if Path(f).suffix.lower() in (".txt", ".m3u", ".m3u8")
+        ]
+        if link_sources:
+            try:
+                await run_extract(
+                    archive_path,
+                    str(extract_dir),
+                    password=password,
+                    cancel_check=lambda: user_cancelled.get(user_id, False),
+                    members=link_sources,
+                    progress=tp.callback("Scan"),
+                )
+            except ExtractionCancelled:
+                await tp.finish(
+                    "Task cancel ho gaya mid‑way, output skip kar diya."
+                )
+                return
+            except Exception as e:
+                await tp.finish(f"Extract error:\n<code>{e}</code>")
+                return
+
         if user_cancelled.get(user_id):
-            await status_msg.edit_text(
+            await tp.finish(
                 "Task cancel ho gaya mid‑way, output skip kar diya."
             )
             return
 
-        stats = result["stats"]
-        files = sorted(result["files"], key=lambda p: p.lower())
-
         links_map = extract_links_from_folder(str(extract_dir))
+        manifest = archive_cache.put(
+            cache_key,
+            {
+                "files": files,
+                "sizes": listing["sizes"],
+                "stats": stats,
+                "total_size": listing["total_size"],
+                "links": {k: len(v) for k, v in links_map.items()},
+                "archive_name": os.path.basename(archive_path),
+            },
+        )
 
         task_id = uuid.uuid4().hex
         tasks[task_id] = {
@@ -1304,44 +1482,361 @@ async def run_unzip_task(client: Client, msg: Message, password: Optional[str]):
             "user_id": user_id,
             "base_dir": str(extract_dir),
             "files": files,
+            "sizes": listing["sizes"],
             "archive_name": os.path.basename(archive_path),
+            "archive_path": archive_path,
+            "password": password,
+            "cache_key": cache_key,
+            "source_doc": doc,
+            "temp_root": str(temp_root),
         }
 
-        summary = (
-            f"<b>Extraction done ✅</b>\n\n"
-            f"Archive: <code>{os.path.basename(archive_path)}</code>\n"
-            f"Total files: {stats['total_files']}\n"
-            f"Folders: {stats['folders']}\n"
-            f"Videos: {stats['videos']} | PDFs: {stats['pdf']} | APK: {stats['apk']}\n"
-            f"TXT: {stats['txt']} | M3U/M3U8: {stats['m3u']} | Others: {stats['others']}\n\n"
-            f"Links inside archive:\n"
-            f"• Direct: {len(links_map.get('direct', []))}\n"
-            f"• m3u8: {len(links_map.get('m3u8', []))}\n"
-            f"• GDrive: {len(links_map.get('gdrive', []))}\n"
-            f"• Telegram: {len(links_map.get('telegram', []))}\n"
-        )
+        text, kb = archive_menu(task_id, manifest)
+        await tp.finish(text, reply_markup=kb)
+        await update_user_stats(user_id, size_mb)
+
+
+def archive_menu(task_id: str, manifest: Dict[str, Any], cached: bool = False):
+    """Archive summary text + file buttons (fresh scan ya cache, dono ke liye)."""
+    stats = manifest["stats"]
+    links = manifest.get("links", {})
+    summary = (
+        f"<b>Archive ready ✅</b>{' ⚡ (cache)' if cached else ''}\n\n"
+        f"Archive: <code>{manifest['archive_name']}</code>\n"
+        f"Total files: {stats['total_files']} ({human_bytes(manifest['total_size'])})\n"
+        f"Folders: {stats['folders']}\n"
+        f"Videos: {stats['videos']} | PDFs: {stats['pdf']} | APK: {stats['apk']}\n"
+        f"TXT: {stats['txt']} | M3U/M3U8: {stats['m3u']} | Others: {stats['others']}\n\n"
+        f"Links inside archive:\n"
+        f"• Direct: {links.get('direct', 0)}\n"
+        f"• m3u8: {links.get('m3u8', 0)}\n"
+        f"• GDrive: {links.get('gdrive', 0)}\n"
+        f"• Telegram: {links.get('telegram', 0)}\n"
+    )
+
+    rows = []
+    rows.append(
+        [InlineKeyboardButton("❌ Cancel", callback_data=f"ucancel|{task_id}")]
+    )
+    rows.append(
+        [InlineKeyboardButton("🚀 Send ALL files", callback_data=f"sendall|{task_id}")]
+    )
 
-        rows = []
+    max_files_buttons = 25
+    for idx, rel_path in enumerate(manifest["files"][:max_files_buttons]):
+        short = rel_path
+        if len(short) > 40:
+            short = "..." + short[-37:]
         rows.append(
-            [InlineKeyboardButton("❌ Cancel", callback_data=f"ucancel|{task_id}")]
+            [InlineKeyboardButton(short, callback_data=f"sendone|{task_id}|{idx}")]
         )
-        rows.append(
-            [InlineKeyboardButton("🚀 Send ALL files", callback_data=f"sendall|{task_id}")]
+
+    return summary, InlineKeyboardMarkup(rows)
+
+
+async def ensure_archive(
+    client: Client,
+    info: Dict[str, Any],
+    status_msg: Message,
+    tp: Optional[TaskProgress] = None,
+):
+    """
+    Cache se bane task me archive disk pe nahi hota; pehli zarurat pe download.
+    tp diya ho to progress task ke "Download" stage me.
+    """
+    path = info.get("archive_path")
+    if path and os.path.isfile(path):
+        return
+
+    archive_name = info.get("archive_name", "archive")
+    if tp:
+        await tp.note("Archive server pe laa raha hu…")
+        progress, progress_args = tp.callback("Download"), ()
+    else:
+        await status_msg.edit_text("Archive server pe laa raha hu…")
+        progress = progress_for_pyrogram
+        progress_args = (status_msg, time.time(), archive_name, "to my server")
+    downloaded = await download_media_parallel(
+        client,
+        info["source_doc"],
+        info["temp_root"],
+        progress=progress,
+        progress_args=progress_args,
+        cancel_check=lambda: user_cancelled.get(info["user_id"], False),
+    )
+    if not downloaded:
+        raise RuntimeError("Archive download nahi hua.")
+    info["archive_path"] = downloaded
+    if tp:
+        tp.complete("Download")
+
+
+async def send_cached_outputs(
+    client: Client,
+    user,
+    chat_id: int,
+    reply_to: int,
+    rel: str,
+    outputs: list,
+    context: str,
+) -> list:
+    """Pehle bheje gaye parts file_id se (no download / extract / upload)."""
+    sent_msgs = []
+    for i, (kind, file_id) in enumerate(outputs, start=1):
+        tag = (i, len(outputs)) if len(outputs) > 1 else None
+        sent = await send_file_id(
+            client, chat_id, kind, file_id, file_caption(user.id, rel, tag), reply_to
         )
+        sent_msgs.append(sent)
+        try:
+            await log_user_output(client, user, sent, context)
+        except Exception:
+            pass
+    return sent_msgs
 
-        max_files_buttons = 25
-        for idx, rel_path in enumerate(files[:max_files_buttons]):
-            short = rel_path
-            if len(short) > 40:
-                short = "..." + short[-37:]
-            rows.append(
-                [InlineKeyboardButton(short, callback_data=f"sendone|{task_id}|{idx}")]
-            )
 
-        kb = InlineKeyboardMarkup(rows)
+def note_output(info: Dict[str, Any], rel: str, part, msg: Optional[Message]):
+    # archive manifest me file_id yaad rakho (agli baar same archive pe reuse)
+    if msg is None:
+        return
+    kind, media = media_of(msg)
+    if media is not None:
+        record_output(info.get("cache_key"), rel, part, kind, media.file_id)
 
-        await status_msg.edit_text(summary, reply_markup=kb)
-        await update_user_stats(user_id, size_mb)
+
+async def extract_task_files(
+    info: Dict[str, Any],
+    status_msg: Message,
+    user_id: int,
+    members: Optional[list] = None,
+):
+    """
+    Unzip task ki files disk pe laata hai: members=None -> poora archive,
+    warna sirf wahi files (sendone). Raises ExtractionCancelled / extract errors.
+    """
+    archive_name = info.get("archive_name", "archive")
+    start_x = time.time()
+
+    async def _extract_progress(done: int, total: int):
+        await progress_for_pyrogram(
+            done, total, status_msg, start_x, archive_name, "extracting on server"
+        )
+
+    await run_extract(
+        info["archive_path"],
+        info["base_dir"],
+        password=info.get("password"),
+        cancel_check=lambda: user_cancelled.get(user_id, False),
+        progress=_extract_progress,
+        members=members,
+    )
+
+
+async def upload_local_file(
+    client: Client,
+    chat_id: int,
+    full: Path,
+    rel: str,
+    caption: str,
+    user_id: int,
+    progress,
+    reply_to: Optional[int] = None,
+    progress_args: tuple = (),
+) -> Message:
+    """
+    Local file upload: video -> playable + thumb, baaki document.
+    Same content pehle bheja ja chuka ho to cached file_id se turant (no upload).
+    """
+    try:
+        key = await content_hash(str(full))
+    except OSError:
+        key = None
+    if key:
+        sent = await send_cached(client, chat_id, key, caption, reply_to)
+        if sent:
+            return sent
+
+    if is_video_path(rel):
+        video_kw = await video_send_kwargs(user_id, str(full))
+        sent = await client.send_video(
+            chat_id,
+            str(full),
+            caption=caption,
+            **video_kw,
+            progress=progress,
+            progress_args=progress_args,
+            reply_to_message_id=reply_to,
+        )
+    else:
+        sent = await client.send_document(
+            chat_id=chat_id,
+            document=str(full),
+            caption=caption,
+            progress=progress,
+            progress_args=progress_args,
+            reply_to_message_id=reply_to,
+        )
+
+    if key:
+        try:
+            await remember(client, key, sent)
+        except Exception:
+            pass
+    return sent
+
+
+def file_caption(
+    user_id: int,
+    rel: str,
+    part: Optional[Tuple[int, int]] = None,
+    label: Optional[str] = None,
+) -> str:
+    """Video -> user caption settings, baaki file path; split part ho to "Part i/n"."""
+    if is_video_path(rel):
+        caption = build_caption(user_id, label or Path(rel).name)
+    else:
+        caption = label or rel
+    if part:
+        caption += f"\n📦 Part {part[0]}/{part[1]}"
+    return caption
+
+
+async def split_local_file(
+    full: Path,
+    rel: str,
+    user_id: int,
+    notify: Callable[[str], Awaitable[Any]],
+) -> list:
+    """
+    Telegram limit se badi file -> parts (video playable parts, baaki raw chunks).
+    notify(text) status dikhata hai (status.edit_text ya TaskProgress.note).
+    """
+    if not needs_split(str(full)):
+        return [str(full)]
+    try:
+        await notify(
+            f"✂️ File {Config.MAX_UPLOAD_MB} MB se badi hai, parts bana raha hu:\n{Path(rel).name}"
+        )
+    except Exception:
+        pass
+    return await split_for_upload(
+        str(full),
+        video=is_video_path(rel),
+        cancel_check=lambda: user_cancelled.get(user_id, False),
+    )
+
+
+async def send_local_file(
+    client: Client,
+    user,
+    chat_id: int,
+    reply_to: int,
+    rel: str,
+    full: Path,
+    context: str,
+    status: Optional[Message] = None,
+    label: Optional[str] = None,
+) -> list:
+    """
+    Local file user ko bhejta hai (video -> playable + thumb, baaki document),
+    "Uploading" status ke saath. Telegram limit se badi ho to pehle parts,
+    phir har part order me "Part i/n" caption ke saath. Sent messages return.
+    Helper bots hon to upload kam load wala bot log chat me karta hai,
+    main bot wahan se user ko copy karta hai (log bhi wahi message).
+    """
+    stage_chat_id = stage_root = None
+    if client_pool.has_helpers():
+        stage_chat_id, stage_root = await get_user_log_target(client, user)
+
+    own_status = status is None
+    if own_status:
+        status = await client.send_message(
+            chat_id,
+            f"Uploading: {Path(rel).name}",
+            reply_to_message_id=reply_to,
+        )
+
+    sent_msgs = []
+    try:
+        parts = await split_local_file(full, rel, user.id, status.edit_text)
+        for i, part in enumerate(parts, start=1):
+            if user_cancelled.get(user.id):
+                break
+            tag = (i, len(parts)) if len(parts) > 1 else None
+            name = Path(part).name
+            caption = file_caption(user.id, rel, tag, label)
+            try:
+                await status.edit_text(f"Uploading: {name}")
+            except Exception:
+                pass
+            start_u = time.time()
+            progress_args = (status, start_u, name, "to Telegram")
+            try:
+                async with client_pool.uploader() as up:
+                    if stage_chat_id and up is not client:
+                        staged = await upload_local_file(
+                            up,
+                            stage_chat_id,
+                            Path(part),
+                            name,
+                            f"{output_log_caption(user, context)}\n\n{caption}",
+                            user.id,
+                            progress_for_pyrogram,
+                            stage_root,
+                            progress_args=progress_args,
+                        )
+                    else:
+                        staged = None
+                        sent = await upload_local_file(
+                            client,
+                            chat_id,
+                            Path(part),
+                            name,
+                            caption,
+                            user.id,
+                            progress_for_pyrogram,
+                            reply_to,
+                            progress_args=progress_args,
+                        )
+            finally:
+                if part != str(full):
+                    _remove_sent_file(Path(part))
+            if staged is not None:
+                sent = await client.copy_message(
+                    chat_id,
+                    staged.chat.id,
+                    staged.id,
+                    caption=caption,
+                    reply_to_message_id=reply_to,
+                )
+            else:
+                try:
+                    await log_user_output(client, user, sent, context)
+                except Exception:
+                    pass
+            sent_msgs.append(sent)
+    finally:
+        close_progress(status)
+        if own_status:
+            try:
+                await status.delete()
+            except Exception:
+                pass
+    return sent_msgs
+
+
+def _remove_sent_file(full: Path):
+    # pipeline mode: bhejne ke baad disk free karo (thumb media cache me hai)
+    try:
+        os.remove(str(full))
+    except OSError:
+        pass
+
+
+def upload_workers_for(user_id: int) -> int:
+    if is_premium_user(user_id):
+        return Config.UPLOAD_WORKERS_PREMIUM
+    return Config.UPLOAD_WORKERS_FREE
 
 
 async def handle_send_all(client: Client, cq: CallbackQuery, task_id: str):
@@ -1359,98 +1854,252 @@ async def handle_send_all(client: Client, cq: CallbackQuery, task_id: str):
         return
 
     base_dir = Path(info["base_dir"])
-    files = info["files"]
     archive_name = info.get("archive_name", "archive")
+    sizes = info.get("sizes", {})
+    total_files = len(info["files"])
+    context = f"unzip send_all from {archive_name}"
 
     await cq.answer()
-    await cq.message.edit_text(
-        "Sending all extracted files… thoda time lag sakta hai."
-    )
-
+    user_cancelled[user.id] = False
+    status_msg = cq.message
     chat_id = cq.message.chat.id
     reply_to = cq.message.id
-    is_private = cq.message.chat.type == enums.ChatType.PRIVATE
-    pinned = False
 
-    if is_private:
+    # poora archive pehle bheja ja chuka hai -> sab file_id se, no download
+    manifest = archive_cache.get(info.get("cache_key"))
+    if is_complete(manifest):
+        await send_all_cached(client, cq, info, manifest, context)
+        return
+
+    # lazy archive download + extract + uploads: asli disk / network load
+    async with job_slot(user.id, (RES_NET, RES_DISK), status_msg):
+        # ek status message poore task ke liye: (download) -> extract + upload;
+        # weights bytes ke hisaab se, extract local disk pe upload se kaafi tez
+        total_bytes = sum(sizes.values()) or 1
+        stages = []
+        archive_path = info.get("archive_path")
+        if not (archive_path and os.path.isfile(archive_path)):
+            archive_size = getattr(info.get("source_doc"), "file_size", 0) or total_bytes
+            stages.append(("Download", archive_size))
+        stages += [("Extract", total_bytes * 0.3), ("Upload", total_bytes)]
+        tp = TaskProgress(status_msg, archive_name, stages)
+        info["progress"] = tp
         try:
-            await client.pin_chat_message(chat_id, cq.message.id)
-            pinned = True
-        except Exception:
-            pinned = False
+            try:
+                await ensure_archive(client, info, status_msg, tp)
+            except DownloadCancelled:
+                await tp.finish("Task cancel kar diya ✅")
+                return
+            except Exception as e:
+                await tp.finish(f"Archive download fail:\n<code>{e}</code>")
+                return
 
-    for rel in files:
-        if user_cancelled.get(user.id):
-            break
+            await tp.note("Extract + send chal raha hai… thoda time lag sakta hai.")
 
-        full = base_dir / rel
-        if not full.is_file():
-            continue
-        try:
-            sent = None
-            if is_video_path(rel):
-                name = Path(rel).name
-                base_caption = name
-                caption = build_caption(user.id, base_caption)
-                thumb_arg = await choose_thumbnail(user.id, str(full))
+            is_private = cq.message.chat.type == enums.ChatType.PRIVATE
+            pinned = False
 
-                status = await client.send_message(
-                    chat_id,
-                    f"Uploading: {name}",
-                    reply_to_message_id=reply_to,
-                )
-                start_u = time.time()
-                sent = await client.send_video(
-                    chat_id,
-                    str(full),
-                    caption=caption,
-                    thumb=thumb_arg,
-                    progress=progress_for_pyrogram,
-                    progress_args=(status, start_u, name, "to Telegram"),
-                    reply_to_message_id=reply_to,
-                )
+            if is_private:
                 try:
-                    await status.delete()
+                    await client.pin_chat_message(chat_id, cq.message.id)
+                    pinned = True
                 except Exception:
-                    pass
-            else:
-                status = await client.send_message(
-                    chat_id,
-                    f"Uploading: {rel}",
-                    reply_to_message_id=reply_to,
+                    pinned = False
+
+            # Staging: workers parallel me log chat me upload karte hain, phir files
+            # order me user chat me copy hoti hain. Log chat na ho to 1 worker, direct.
+            # Helper bots ke saath har bot ko utne hi workers.
+            stage_chat_id, stage_root = await get_user_log_target(client, user)
+            workers = upload_workers_for(user.id) * (1 + len(client_pool.helpers)) if stage_chat_id else 1
+            pool = UploadPool(workers)
+
+            uploaded: Dict[str, int] = {}
+            cancelled = False
+            error = None
+
+            async def _aggregate_progress(rel: str, current: int):
+                uploaded[rel] = current
+                done_files = pool.sent + pool.failed
+                tp.update(
+                    "Upload",
+                    min(sum(uploaded.values()), total_bytes - 1),
+                    total_bytes,
+                    f"{done_files}/{total_files} files",
                 )
-                start_u = time.time()
-                sent = await client.send_document(
-                    chat_id=chat_id,
-                    document=str(full),
-                    caption=rel,
-                    progress=progress_for_pyrogram,
-                    progress_args=(status, start_u, rel, "to Telegram"),
-                    reply_to_message_id=reply_to,
+
+            async def upload(item):
+                rel, full_path, part = item
+                full = Path(full_path)
+                key = str(full)
+
+                async def _progress(current: int, _total: int):
+                    await _aggregate_progress(key, current)
+
+                if stage_chat_id:
+                    # helper bots hon to jo bot free hai wahi staging upload kare
+                    cap = f"{output_log_caption(user, context)}\n\n{rel}"
+                    async with client_pool.uploader() as up:
+                        return await upload_local_file(
+                            up, stage_chat_id, full, full.name, cap, user.id, _progress, stage_root
+                        )
+
+                caption = file_caption(user.id, rel, part)
+                sent = await upload_local_file(
+                    client, chat_id, full, full.name, caption, user.id, _progress, reply_to
                 )
                 try:
-                    await status.delete()
+                    await log_user_output(client, user, sent, context)
                 except Exception:
                     pass
+                return sent
 
-            if sent:
+            def upload_done(item):
+                # FloodWait retry ke baad hi (final result pe) file hatao
+                rel, full_path, part = item
+                full = Path(full_path)
                 try:
-                    await log_user_output(
-                        client, user, sent, f"unzip send_all from {archive_name}"
+                    uploaded[str(full)] = full.stat().st_size if part else sizes.get(rel, 0)
+                except OSError:
+                    pass
+                _remove_sent_file(full)
+
+            async def commit(item, staged: Message):
+                rel, _, part = item
+                if not stage_chat_id:
+                    note_output(info, rel, part, staged)
+                    return staged
+                caption = file_caption(user.id, rel, part)
+                sent = await client.copy_message(
+                    chat_id,
+                    staged.chat.id,
+                    staged.id,
+                    caption=caption,
+                    reply_to_message_id=reply_to,
+                )
+                note_output(info, rel, part, sent)
+                return sent
+
+            # pre-pass: har file extract hote hi uska content hash, aur video ka
+            # thumb/metadata ffmpeg pool (thumbnail lane) pe, upload tak ready
+            time_pos = thumb_time_pos(user.id)
+            prewarm_tasks: Set[asyncio.Task] = set()
+
+            def prewarm(coro):
+                t = asyncio.create_task(coro)
+                prewarm_tasks.add(t)
+                t.add_done_callback(prewarm_tasks.discard)
+
+            async def with_prewarm(members):
+                # (rel, path, part): Telegram limit se badi file yahin parts me toot ti hai
+                async for rel, full_path, digest in members:
+                    # extract ke saath bana hash: prehash ko file dobara nahi padhni
+                    note_hash(full_path, digest)
+                    parts = [full_path]
+                    if needs_split(full_path):
+                        parts = await split_local_file(Path(full_path), rel, user.id, tp.note)
+                        if parts != [full_path]:
+                            _remove_sent_file(Path(full_path))
+                    for i, part_path in enumerate(parts, start=1):
+                        # content hash (file_id cache) + video thumb upload se pehle
+                        prewarm(prehash(part_path))
+                        if is_video_path(part_path):
+                            prewarm(prewarm_video(part_path, time_pos))
+                        tag = (i, len(parts)) if len(parts) > 1 else None
+                        yield rel, part_path, tag
+
+            # pipeline: worker files extract karta hai, upload pool unhe uthata hai,
+            # bhejne ke baad delete; disk pe ~workers jitni files hi rehti hain
+            try:
+                async with aclosing(
+                    iter_extract(
+                        info["archive_path"],
+                        str(base_dir),
+                        password=info.get("password"),
+                        cancel_check=lambda: user_cancelled.get(user.id, False),
+                        progress=tp.callback("Extract"),
+                        queue_size=workers,
                     )
+                ) as members:
+                    async with aclosing(with_prewarm(members)) as items:
+                        await pool.run(
+                            items,
+                            upload,
+                            commit,
+                            should_stop=lambda: user_cancelled.get(user.id, False),
+                            on_done=upload_done,
+                        )
+            except ExtractionCancelled:
+                cancelled = True
+            except Exception as e:
+                error = e
+
+            for t in list(prewarm_tasks):
+                t.cancel()
+
+            if is_private and pinned:
+                try:
+                    await client.unpin_chat_message(chat_id, cq.message.id)
                 except Exception:
                     pass
-        except Exception:
-            pass
-        await asyncio.sleep(0.5)
 
-    if is_private and pinned:
+            cancelled = cancelled or user_cancelled.get(user.id, False)
+            if cancelled:
+                head = "Task cancel kar diya ✅"
+            elif isinstance(error, WrongPassword):
+                head = f"{error}\nUse 'With Password' button & try again."
+            elif error is not None:
+                head = f"Extract error:\n<code>{error}</code>"
+            else:
+                head = "All extracted files sent ✅"
+            try:
+                await tp.finish(
+                    f"<b>{archive_name}</b>\n\n{head}\nSent: {pool.sent} | Failed: {pool.failed}"
+                )
+            except Exception:
+                pass
+        finally:
+            info.pop("progress", None)
+            tp.close()
+
+
+async def send_all_cached(
+    client: Client,
+    cq: CallbackQuery,
+    info: Dict[str, Any],
+    manifest: Dict[str, Any],
+    context: str,
+):
+    """Archive cache hit: saari files order me file_id se (instant)."""
+    user = cq.from_user
+    chat_id = cq.message.chat.id
+    reply_to = cq.message.id
+    await cq.message.edit_text("⚡ Archive cache me hai, files turant bhej raha hu…")
+
+    pool = UploadPool(1)  # sirf FloodWait handling ke liye
+    for rel in manifest["files"]:
+        if user_cancelled.get(user.id):
+            break
+        outputs = cached_outputs(manifest, rel)
         try:
-            await client.unpin_chat_message(chat_id, cq.message.id)
+            await pool.call(
+                0,
+                lambda: send_cached_outputs(
+                    client, user, chat_id, reply_to, rel, outputs, context
+                ),
+            )
+            pool.sent += 1
         except Exception:
-            pass
+            pool.failed += 1
+
+    if pool.failed:
+        # kuch file_id expire ho gaye, agli baar fresh process
+        archive_cache.drop(info.get("cache_key"))
 
-    await client.send_message(chat_id, "All extracted files sent ✅", reply_to_message_id=reply_to)
+    await client.send_message(
+        chat_id,
+        f"All extracted files sent ✅\nSent: {pool.sent} | Failed: {pool.failed}",
+        reply_to_message_id=reply_to,
+    )
 
 
 async def handle_send_one(
@@ -1478,72 +2127,67 @@ async def handle_send_one(
     base_dir = Path(info["base_dir"])
     rel = files[index]
     full = base_dir / rel
-    if not full.is_file():
-        await cq.message.reply_text("File missing ho gayi lagti hai.")
-        return
-
     chat_id = cq.message.chat.id
     reply_to = cq.message.id
+    context = f"unzip send_one from {info.get('archive_name','archive')}"
 
-    try:
-        sent = None
-        if is_video_path(rel):
-            name = Path(rel).name
-            base_caption = name
-            caption = build_caption(user.id, base_caption)
-            thumb_arg = await choose_thumbnail(user.id, str(full))
-
-            status = await client.send_message(
-                chat_id,
-                f"Uploading: {name}",
-                reply_to_message_id=reply_to,
-            )
-            start_u = time.time()
-            sent = await client.send_video(
-                chat_id,
-                str(full),
-                caption=caption,
-                thumb=thumb_arg,
-                progress=progress_for_pyrogram,
-                progress_args=(status, start_u, name, "to Telegram"),
-                reply_to_message_id=reply_to,
-            )
+    # pehle bheji ja chuki file -> file_id se
+    outputs = cached_outputs(archive_cache.get(info.get("cache_key")), rel)
+    if outputs and not full.is_file():
+        try:
+            await send_cached_outputs(client, user, chat_id, reply_to, rel, outputs, context)
+            return
+        except Exception:
+            pass
+
+    # extract + upload bhi disk / network load hai -> scheduler slot
+    user_cancelled[user.id] = False
+    status = await client.send_message(
+        chat_id,
+        "Task queue me add ho gaya… ⏳",
+        reply_to_message_id=reply_to,
+    )
+    async with job_slot(user.id, (RES_NET, RES_DISK), status):
+        if not full.is_file():
+            # on-demand: sirf yahi ek file archive se nikaalo
+            await status.edit_text(f"Extracting: {rel}")
             try:
-                await status.delete()
-            except Exception:
-                pass
-        else:
-            status = await client.send_message(
+                await ensure_archive(client, info, status)
+                await extract_task_files(info, status, user.id, members=[rel])
+            except (ExtractionCancelled, DownloadCancelled):
+                await status.edit_text("Task cancel kar diya ✅")
+                return
+            except Exception as e:
+                await status.edit_text(f"Extract error:\n<code>{e}</code>")
+                return
+
+        if not full.is_file():
+            await status.edit_text("File missing ho gayi lagti hai.")
+            return
+
+        try:
+            sent_msgs = await send_local_file(
+                client,
+                user,
                 chat_id,
-                f"Uploading: {rel}",
-                reply_to_message_id=reply_to,
-            )
-            start_u = time.time()
-            sent = await client.send_document(
-                chat_id=chat_id,
-                document=str(full),
-                caption=rel,
-                progress=progress_for_pyrogram,
-                progress_args=(status, start_u, rel, "to Telegram"),
-                reply_to_message_id=reply_to,
+                reply_to,
+                rel,
+                full,
+                context,
+                status=status,
             )
+        except Exception:
+            return
+        finally:
             try:
                 await status.delete()
             except Exception:
                 pass
 
-        if sent:
-            try:
-                await log_user_output(
-                    client,
-                    user,
-                    sent,
-                    f"unzip send_one from {info.get('archive_name','archive')}",
-                )
-            except Exception:
-                pass
-    except Exception:
-        pass
+    if user_cancelled.get(user.id):
+        return  # adhure parts manifest me nahi
+    for i, sent in enumerate(sent_msgs, start=1):
+        note_output(info, rel, (i, len(sent_msgs)) if len(sent_msgs) > 1 else None, sent)
 
 
 async def handle_extract_audio(client: Client, cq: CallbackQuery, msg: Message):
@@ -1561,16 +2205,17 @@ async def handle_extract_audio(client: Client, cq: CallbackQuery, msg: Message):
         await cq.answer("Ye video nahi hai.", show_alert=True)
         return
 
-    lock = get_lock(user_id)
-    if lock.locked():
-        await cq.answer(
-            "Ek task already running hai, thoda wait karo.", show_alert=True
-        )
-        return
-
     await cq.answer()
 
-    async with lock:
+    user_cancelled[user_id] = False
+    reply_to = cq.message.id
+    status = await cq.message.reply_text("Task queue me add ho gaya… ⏳")
+
+    async with job_slot(user_id, (RES_NET, RES_CPU), status):
+        if user_cancelled.get(user_id):
+            await status.edit_text("Task cancel kar diya ✅")
+            return
+
         file_name = video.file_name or "video"
         base_name = os.path.splitext(file_name)[0]
         temp_root = Path(Config.TEMP_DIR) / str(user_id) / uuid.uuid4().hex
@@ -1580,20 +2225,25 @@ async def handle_extract_audio(client: Client, cq: CallbackQuery, msg: Message):
             user_id, str(temp_root), Config.AUTO_DELETE_DEFAULT_MIN
         )
 
-        reply_to = cq.message.id
-        status = await cq.message.reply_text(
-            "Downloading video for audio extract…"
-        )
+        await status.edit_text("Downloading video for audio extract…")
 
         start = time.time()
         try:
-            downloaded_path = await client.download_media(
+            downloaded_path = await download_media_parallel(
+                client,
                 video,
-                file_name=str(temp_root),
+                str(temp_root),
+                file_name=file_name,
                 progress=progress_for_pyrogram,
                 progress_args=(status, start, file_name, "to my server"),
+                cancel_check=lambda: user_cancelled.get(user_id, False),
             )
+        except DownloadCancelled:
+            close_progress(status)
+            await status.edit_text("Task cancel kar diya ✅")
+            return
         except Exception as e:
+            close_progress(status)
             await status.edit_text(f"Download fail:\n<code>{e}</code>")
             return
 
@@ -1603,8 +2253,20 @@ async def handle_extract_audio(client: Client, cq: CallbackQuery, msg: Message):
 
         video_path = downloaded_path
         audio_path = str(temp_root / f"{base_name}.m4a")
+        start_a = time.time()
+
+        async def _audio_progress(done: int, total: int):
+            await progress_for_pyrogram(
+                done, total, status, start_a, f"{base_name}.m4a", "extracting audio"
+            )
+
         try:
-            await extract_audio(video_path, audio_path)
+            await extract_audio(
+                video_path,
+                audio_path,
+                cancel_check=lambda: user_cancelled.get(user_id, False),
+                progress=_audio_progress,
+            )
         except Exception as e:
             await status.edit_text(f"ffmpeg error:\n<code>{e}</code>")
             return
@@ -1685,187 +2347,147 @@ async def handle_links_download_all(
         user_id, str(temp_root), Config.AUTO_DELETE_DEFAULT_MIN
     )
 
-    first_text = (
-        f"Direct: {len(direct_links)} | Unknown(as direct): {len(unknown_links)} | "
-        f"GDrive: {len(gdrive_links)} | m3u8: {len(m3u8_links)}\n"
-        "Downloading supported direct/GDrive files pehle…"
-    )
-    try:
-        await cq.message.edit_text(first_text)
-    except MessageNotModified:
-        pass
-    except Exception:
-        pass
-
-    ok = 0
-    fail = 0
-    chat_id = cq.message.chat.id
-    reply_to = cq.message.id
-    is_private = cq.message.chat.type == enums.ChatType.PRIVATE
-    pinned = False
-
-    if is_private:
+    user_cancelled[user_id] = False
+    async with job_slot(user_id, (RES_NET, RES_DISK), cq.message):
+        first_text = (
+            f"Direct: {len(direct_links)} | Unknown(as direct): {len(unknown_links)} | "
+            f"GDrive: {len(gdrive_links)} | m3u8: {len(m3u8_links)}\n"
+            "Downloading supported direct/GDrive files pehle…"
+        )
         try:
-            await client.pin_chat_message(chat_id, cq.message.id)
-            pinned = True
+            await cq.message.edit_text(first_text)
+        except MessageNotModified:
+            pass
         except Exception:
-            pinned = False
+            pass
 
-    # direct + unknown as direct
-    for url in candidate_direct:
-        if user_cancelled.get(user_id):
-            break
+        ok = 0
+        fail = 0
+        chat_id = cq.message.chat.id
+        reply_to = cq.message.id
+        is_private = cq.message.chat.type == enums.ChatType.PRIVATE
+        pinned = False
 
-        base_raw = url.split("?", 1)[0].split("#", 1)[0]
-        base_guess = base_raw.rsplit("/", 1)[-1] or f"file_{uuid.uuid4().hex}"
-        dest_path = str(temp_root / base_guess)
-        try:
-            status = await client.send_message(
-                chat_id,
-                f"Downloading from link:\n{url}",
-                reply_to_message_id=reply_to,
-            )
-            final_path = await download_file(
-                url,
-                dest_path,
-                status_message=status,
-                file_name=base_guess,
-                direction="to my server",
-            )
-            basename = os.path.basename(final_path)
-            await status.edit_text(f"Uploading to you:\n{basename}")
-            if is_video_path(basename):
-                base_caption = basename
-                caption = build_caption(user_id, base_caption)
-                thumb_arg = await choose_thumbnail(user_id, final_path)
-
-                start_u = time.time()
-                sent = await client.send_video(
-                    chat_id,
-                    final_path,
-                    caption=caption,
-                    thumb=thumb_arg,
-                    progress=progress_for_pyrogram,
-                    progress_args=(status, start_u, basename, "to Telegram"),
-                    reply_to_message_id=reply_to,
-                )
-            else:
-                start_u = time.time()
-                sent = await client.send_document(
-                    chat_id,
-                    final_path,
-                    caption=basename,
-                    progress=progress_for_pyrogram,
-                    progress_args=(status, start_u, basename, "to Telegram"),
-                    reply_to_message_id=reply_to,
-                )
+        if is_private:
             try:
-                await status.delete()
+                await client.pin_chat_message(chat_id, cq.message.id)
+                pinned = True
             except Exception:
-                pass
-            ok += 1
-            try:
-                await log_user_output(
-                    client, user, sent, f"direct/unknown link: {url}"
-                )
-            except Exception:
-                pass
-        except Exception:
-            fail += 1
-        await asyncio.sleep(0.5)
+                pinned = False
 
-    # Google Drive
-    for url in gdrive_links:
-        if user_cancelled.get(user_id):
-            break
+        # direct + unknown as direct
+        for url in candidate_direct:
+            if user_cancelled.get(user_id):
+                break
 
-        direct_url = get_gdrive_direct_link(url)
-        if not direct_url:
-            fail += 1
-            continue
-        base_raw = direct_url.split("?", 1)[0].split("#", 1)[0]
-        base_guess = base_raw.rsplit("/", 1)[-1] or f"gdrive_{uuid.uuid4().hex}"
-        dest_path = str(temp_root / base_guess)
-        try:
-            status = await client.send_message(
-                chat_id,
-                f"Downloading from GDrive:\n{url}",
-                reply_to_message_id=reply_to,
-            )
-            final_path = await download_file(
-                direct_url,
-                dest_path,
-                status_message=status,
-                file_name=base_guess,
-                direction="to my server",
-            )
-            basename = os.path.basename(final_path)
-            await status.edit_text(f"Uploading to you:\n{basename}")
-            if is_video_path(basename):
-                base_caption = basename
-                caption = build_caption(user_id, base_caption)
-                thumb_arg = await choose_thumbnail(user_id, final_path)
-
-                start_u = time.time()
-                sent = await client.send_video(
+            base_raw = url.split("?", 1)[0].split("#", 1)[0]
+            base_guess = base_raw.rsplit("/", 1)[-1] or f"file_{uuid.uuid4().hex}"
+            try:
+                dest_path = str(await link_work_dir(user_id, url) / base_guess)
+                status = await client.send_message(
                     chat_id,
-                    final_path,
-                    caption=caption,
-                    thumb=thumb_arg,
-                    progress=progress_for_pyrogram,
-                    progress_args=(status, start_u, basename, "to Telegram"),
+                    f"Downloading from link:\n{url}",
                     reply_to_message_id=reply_to,
                 )
-            else:
-                start_u = time.time()
-                sent = await client.send_document(
+                final_path = await download_file(
+                    url,
+                    dest_path,
+                    status_message=status,
+                    file_name=base_guess,
+                    direction="to my server",
+                )
+                basename = os.path.basename(final_path)
+                await status.edit_text(f"Uploading to you:\n{basename}")
+                await send_local_file(
+                    client,
+                    user,
                     chat_id,
-                    final_path,
-                    caption=basename,
-                    progress=progress_for_pyrogram,
-                    progress_args=(status, start_u, basename, "to Telegram"),
-                    reply_to_message_id=reply_to,
+                    reply_to,
+                    basename,
+                    Path(final_path),
+                    f"direct/unknown link: {url}",
+                    status=status,
                 )
-            try:
-                await status.delete()
+                try:
+                    await status.delete()
+                except Exception:
+                    pass
+                ok += 1
             except Exception:
-                pass
-            ok += 1
+                fail += 1
+            await asyncio.sleep(0.5)
+
+        # Google Drive
+        for url in gdrive_links:
+            if user_cancelled.get(user_id):
+                break
+
+            direct_url = get_gdrive_direct_link(url)
+            if not direct_url:
+                fail += 1
+                continue
+            base_raw = direct_url.split("?", 1)[0].split("#", 1)[0]
+            base_guess = base_raw.rsplit("/", 1)[-1] or f"gdrive_{uuid.uuid4().hex}"
             try:
-                await log_user_output(
-                    client, user, sent, f"GDrive link: {url}"
+                dest_path = str(await link_work_dir(user_id, direct_url) / base_guess)
+                status = await client.send_message(
+                    chat_id,
+                    f"Downloading from GDrive:\n{url}",
+                    reply_to_message_id=reply_to,
+                )
+                final_path = await download_file(
+                    direct_url,
+                    dest_path,
+                    status_message=status,
+                    file_name=base_guess,
+                    direction="to my server",
+                )
+                basename = os.path.basename(final_path)
+                await status.edit_text(f"Uploading to you:\n{basename}")
+                await send_local_file(
+                    client,
+                    user,
+                    chat_id,
+                    reply_to,
+                    basename,
+                    Path(final_path),
+                    f"GDrive link: {url}",
+                    status=status,
                 )
+                try:
+                    await status.delete()
+                except Exception:
+                    pass
+                ok += 1
             except Exception:
-                pass
-        except Exception:
-            fail += 1
-        await asyncio.sleep(0.5)
-
-    # m3u8: quality menus
-    for url in m3u8_links:
-        if user_cancelled.get(user_id):
-            break
-        await offer_m3u8_quality_menu(client, cq, user_id, url, temp_root)
-
-    txt = (
-        f"Direct/GDrive download complete.\n"
-        f"Success: {ok}\n"
-        f"Failed: {fail}\n\n"
-        f"m3u8 links ke liye quality choose karne ke buttons alag se bhej diye gaye hain."
-    )
-    try:
-        await cq.message.edit_text(txt)
-    except MessageNotModified:
-        pass
-    except Exception:
-        pass
-
-    if is_private and pinned:
+                fail += 1
+            await asyncio.sleep(0.5)
+
+        # m3u8: quality menus
+        for url in m3u8_links:
+            if user_cancelled.get(user_id):
+                break
+            await offer_m3u8_quality_menu(client, cq, user_id, url, temp_root)
+
+        txt = (
+            f"Direct/GDrive download complete.\n"
+            f"Success: {ok}\n"
+            f"Failed: {fail}\n\n"
+            f"m3u8 links ke liye quality choose karne ke buttons alag se bhej diye gaye hain."
+        )
         try:
-            await client.unpin_chat_message(chat_id, cq.message.id)
+            await cq.message.edit_text(txt)
+        except MessageNotModified:
+            pass
         except Exception:
             pass
-        await client.send_message(chat_id, "All link downloads finished ✅", reply_to_message_id=reply_to)
+
+        if is_private and pinned:
+            try:
+                await client.unpin_chat_message(chat_id, cq.message.id)
+            except Exception:
+                pass
+            await client.send_message(chat_id, "All link downloads finished ✅", reply_to_message_id=reply_to)
 
 
 async def offer_m3u8_quality_menu(
@@ -1945,42 +2567,54 @@ async def handle_m3u8_quality_choice(
     reply_to = cq.message.id
 
     await cq.answer()
-    await cq.message.edit_text(f"Downloading {name} stream…")
+    user_cancelled[user_id] = False
+    async with job_slot(user_id, (RES_NET, RES_CPU), cq.message):
+        await cq.message.edit_text(f"Downloading {name} stream…")
 
-    dest_path = str(temp_root / f"{base_name}_{name}.mp4")
-    try:
-        await download_m3u8_stream(url, dest_path)
-    except Exception as e:
-        await cq.message.edit_text(f"m3u8 download fail:\n<code>{e}</code>")
-        M3U8_TASKS.pop(task_id, None)
-        return
+        dest_path = str(temp_root / f"{base_name}_{name}.mp4")
+        start_d = time.time()
 
-    base_caption = f"{base_name} [{name}]"
-    caption = build_caption(user_id, base_caption)
-    thumb_arg = await choose_thumbnail(user_id, dest_path)
+        async def _dl_progress(done: int, total: int):
+            await progress_for_pyrogram(
+                done, total, cq.message, start_d, f"{base_name} [{name}]", "to my server"
+            )
 
-    await cq.message.edit_text("Uploading m3u8 video to you…")
-    start_u = time.time()
-    sent = await client.send_video(
-        chat_id,
-        dest_path,
-        caption=caption,
-        thumb=thumb_arg,
-        progress=progress_for_pyrogram,
-        progress_args=(cq.message, start_u, base_caption, "to Telegram"),
-        reply_to_message_id=reply_to,
-    )
-    try:
-        await cq.message.delete()
-    except Exception:
-        pass
-    try:
-        await log_user_output(
-            client, user, sent, f"m3u8 link: {url}"
-        )
-    except Exception:
-        pass
-    M3U8_TASKS.pop(task_id, None)
+        try:
+            await download_m3u8_stream(
+                url,
+                dest_path,
+                progress=_dl_progress,
+                cancel_check=lambda: user_cancelled.get(user_id, False),
+            )
+        except Exception as e:
+            await cq.message.edit_text(f"m3u8 download fail:\n<code>{e}</code>")
+            M3U8_TASKS.pop(task_id, None)
+            return
+
+        base_caption = f"{base_name} [{name}]"
+
+        await cq.message.edit_text("Uploading m3u8 video to you…")
+        try:
+            await send_local_file(
+                client,
+                user,
+                chat_id,
+                reply_to,
+                os.path.basename(dest_path),
+                Path(dest_path),
+                f"m3u8 link: {url}",
+                status=cq.message,
+                label=base_caption,
+            )
+        except Exception as e:
+            await cq.message.edit_text(f"Upload fail:\n<code>{e}</code>")
+            M3U8_TASKS.pop(task_id, None)
+            return
+        try:
+            await cq.message.delete()
+        except Exception:
+            pass
+        M3U8_TASKS.pop(task_id, None)
 
 
 # ----------------- main (local run only; Render par server.py) -----------------
@@ -1988,10 +2622,16 @@ async def handle_m3u8_quality_choice(
 
 async def main():
     asyncio.create_task(cleanup_worker())
+    await start_http_client()
     await app.start()
+    await client_pool.start_helpers()
     print("Serena Unzip bot started.")
     await idle()
+    await client_pool.stop_helpers()
     await app.stop()
+    await flush_db_writes()
+    shutdown_extract_pools()
+    await close_http_client()
 
 
 if __name__ == "__main__":
@@ -27,6 +27,9 @@ class Config:
 
     # Progress bar
     PROGRESS_UPDATE_INTERVAL = int(os.getenv("PROGRESS_UPDATE_INTERVAL", "5"))  # seconds
+    # Telegram edit budget (saare progress edits ek dispatcher se)
+    EDIT_PER_SEC = float(os.getenv("EDIT_PER_SEC", "8"))  # per bot
+    EDIT_CHAT_INTERVAL = float(os.getenv("EDIT_CHAT_INTERVAL", "3"))  # seconds, per chat
 
     # Cleanup & limits
     AUTO_DELETE_DEFAULT_MIN = int(os.getenv("AUTO_DELETE_DEFAULT_MIN", "30"))  # server files TTL
@@ -39,5 +42,67 @@ class Config:
     MAX_ARCHIVE_SIZE_FREE_MB = int(os.getenv("MAX_ARCHIVE_SIZE_FREE_MB", "2048"))  # 2 GB
     MAX_ARCHIVE_SIZE_PREMIUM_MB = int(os.getenv("MAX_ARCHIVE_SIZE_PREMIUM_MB", "10240"))  # 10 GB+
 
+    # Extraction workers (zip/7z -> processes, tar/rar -> threads)
+    EXTRACT_PROCESS_WORKERS = int(os.getenv("EXTRACT_PROCESS_WORKERS", str(min(os.cpu_count() or 2, 4))))
+    EXTRACT_THREAD_WORKERS = int(os.getenv("EXTRACT_THREAD_WORKERS", "4"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))  # extracted files waiting for upload
+
+    # Extra bots sirf uploads ke liye (comma separated); log channel me admin hone chahiye
+    HELPER_BOT_TOKENS = [t.strip() for t in os.getenv("HELPER_BOT_TOKENS", "").split(",") if t.strip()]
+
+    # Telegram transfers: pyrogram default 1 parallel upload/download hai
+    TG_MAX_TRANSMISSIONS = int(os.getenv("TG_MAX_TRANSMISSIONS", "8"))
+    TG_DOWNLOAD_PARTS = int(os.getenv("TG_DOWNLOAD_PARTS", "4"))      # parallel ranges per file
+    TG_PARALLEL_MIN_MB = int(os.getenv("TG_PARALLEL_MIN_MB", "32"))   # isse chhoti file normal download
+
+    # Telegram per-file upload limit; isse badi files parts me split
+    MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "1990"))
+
+    # Parallel uploads in "Send ALL" (per user tier)
+    UPLOAD_WORKERS_FREE = int(os.getenv("UPLOAD_WORKERS_FREE", "2"))
+    UPLOAD_WORKERS_PREMIUM = int(os.getenv("UPLOAD_WORKERS_PREMIUM", "4"))
+
+    # Global job scheduler (admission control across all users)
+    SCHED_MAX_JOBS = int(os.getenv("SCHED_MAX_JOBS", "6"))
+    SCHED_NET_SLOTS = int(os.getenv("SCHED_NET_SLOTS", "4"))      # downloads
+    SCHED_DISK_SLOTS = int(os.getenv("SCHED_DISK_SLOTS", "3"))    # archive extract
+    SCHED_CPU_SLOTS = int(os.getenv("SCHED_CPU_SLOTS", str(os.cpu_count() or 2)))  # ffmpeg
+    SCHED_PER_USER = int(os.getenv("SCHED_PER_USER", "1"))
+
+    # HTTP link downloads (parallel ranged segments)
+    HTTP_SEGMENTS = int(os.getenv("HTTP_SEGMENTS", "4"))
+    HTTP_SEGMENT_MIN_MB = int(os.getenv("HTTP_SEGMENT_MIN_MB", "8"))  # isse chhoti file single stream
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "5"))               # resume attempts per link
+    HTTP_RETRY_BASE_SEC = float(os.getenv("HTTP_RETRY_BASE_SEC", "2"))  # backoff: 2, 4, 8, ...
+    HTTP_CHECKPOINT_SEC = float(os.getenv("HTTP_CHECKPOINT_SEC", "3"))  # sidecar save interval
+
+    # Shared aiohttp connection pool (sab outbound HTTP ke liye)
+    HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+    HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "16"))
+    HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "300"))
+    HTTP_KEEPALIVE_SEC = float(os.getenv("HTTP_KEEPALIVE_SEC", "60"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "30"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+
+    # ffmpeg process pool (sab media jobs ke liye shared)
+    FFMPEG_MAX_PROCS = int(os.getenv("FFMPEG_MAX_PROCS", str(os.cpu_count() or 2)))
+    FFMPEG_STALL_SEC = int(os.getenv("FFMPEG_STALL_SEC", "120"))  # itni der koi progress nahi -> kill
+    # pehle progress block se pehle (input probe / analyze, remote / badi MKV) ki grace
+    FFMPEG_STARTUP_SEC = int(os.getenv("FFMPEG_STARTUP_SEC", "600"))
+    MEDIA_CACHE_SIZE = int(os.getenv("MEDIA_CACHE_SIZE", "512"))  # ffprobe metadata + thumbnails (LRU)
+    ARCHIVE_CACHE_SIZE = int(os.getenv("ARCHIVE_CACHE_SIZE", "200"))  # archive manifests (LRU)
+    FILE_ID_CACHE_SIZE = int(os.getenv("FILE_ID_CACHE_SIZE", "5000"))  # content hash -> file_id, memory (LRU)
+    ARCHIVE_CACHE_TTL_H = float(os.getenv("ARCHIVE_CACHE_TTL_H", "24"))
+
+    # m3u8 / HLS native segment downloader
+    HLS_WORKERS = int(os.getenv("HLS_WORKERS", "8"))            # parallel segment fetch
+    HLS_SEGMENT_RETRIES = int(os.getenv("HLS_SEGMENT_RETRIES", "4"))
+    M3U8_CACHE_SIZE = int(os.getenv("M3U8_CACHE_SIZE", "256"))    # parsed playlists (LRU)
+    M3U8_CACHE_TTL = float(os.getenv("M3U8_CACHE_TTL", "300"))    # seconds, phir revalidate
+
+    # Mongo write-behind: user stats / flags / temp paths batch me likhe jate hain
+    DB_FLUSH_SEC = float(os.getenv("DB_FLUSH_SEC", "2"))
+    DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "200"))
+
     # Misc
     DB_NAME = os.getenv("DB_NAME", "serena_unzip")
@@ -1,8 +1,11 @@
+import asyncio
 import datetime
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import PyMongoError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 
 from config import Config
 
@@ -21,14 +24,25 @@ if USE_DB:
     db = client[Config.DB_NAME]
     users_col = db["users"]
     files_col = db["temp_files"]
+    file_cache_col = db["file_cache"]
 else:
     client = None
     users_col = None
     files_col = None
+    file_cache_col = None
 
 # In‑memory fallback (jab DB use nahi ho raha ho ya fail ho jaye)
 _mem_users: Dict[int, Dict[str, Any]] = {}
 _mem_files: Dict[str, Dict[str, Any]] = {}
+# content hash -> file_id: har upload ka entry, isliye LRU (Mongo me sab rehta hai)
+_mem_file_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _mem_file_cache_put(content_hash: str, entry: Dict[str, Any]):
+    _mem_file_cache[content_hash] = entry
+    _mem_file_cache.move_to_end(content_hash)
+    while len(_mem_file_cache) > max(1, Config.FILE_ID_CACHE_SIZE):
+        _mem_file_cache.popitem(last=False)
 
 
 def _default_user(user_id: int) -> Dict[str, Any]:
@@ -64,6 +78,135 @@ async def _safe_db(coro, default=None):
         return default
 
 
+# ----------------------------------------------------
+#  Write-behind buffer
+# ----------------------------------------------------
+
+class _WriteBuffer:
+    """
+    Request path me Mongo round trip nahi: writes memory me queue hote hain,
+    same doc ke $inc add ho jate hain / $set me last value jeet ti hai,
+    phir har DB_FLUSH_SEC (ya DB_BATCH_SIZE ops hone par turant) ek
+    bulk_write per collection. Memory (_mem_*) pehle hi update hoti hai,
+    to reads pe asar nahi. bulk_write fail ho to ops wapas buffer me
+    (agle flush pe retry).
+    """
+
+    def __init__(self, flush_sec: float, batch_size: int):
+        self.flush_sec = max(0.1, flush_sec)
+        self.batch_size = max(1, batch_size)
+        self._cols: Dict[str, Any] = {}
+        # (collection, _id) -> {"$inc": {...}, "$set": {...}}
+        self._updates: Dict[Tuple[str, Any], Dict[str, Dict[str, Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None  # flushes order me (set_ban on/off)
+        self.stats: Dict[str, int] = {"queued": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def _kick(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        if len(self._updates) >= self.batch_size and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.ensure_future(self.flush())
+
+    @staticmethod
+    def _apply(op: Dict[str, Dict[str, Any]], inc: Dict[str, Any], set_: Dict[str, Any]):
+        for field, value in set_.items():
+            # baad ka $set pehle ke $inc ko overwrite karta hai
+            op["$inc"].pop(field, None)
+            op["$set"][field] = value
+        for field, value in inc.items():
+            if field in op["$set"]:
+                op["$set"][field] += value  # same path dono me allowed nahi
+            else:
+                op["$inc"][field] = op["$inc"].get(field, 0) + value
+
+    def update(
+        self,
+        col,
+        _id,
+        inc: Optional[Dict[str, Any]] = None,
+        set_: Optional[Dict[str, Any]] = None,
+    ):
+        self._cols[col.name] = col
+        op = self._updates.setdefault((col.name, _id), {"$inc": {}, "$set": {}})
+        self._apply(op, inc or {}, set_ or {})
+        self.stats["queued"] += 1
+        self._kick()
+
+    def _requeue(self, key: Tuple[str, Any], old: Dict[str, Dict[str, Any]]):
+        # fail hua op purana hai: iske upar is beech aaye naye writes lagao
+        newer = self._updates.get(key)
+        op = {"$inc": dict(old["$inc"]), "$set": dict(old["$set"])}
+        if newer is not None:
+            self._apply(op, newer["$inc"], newer["$set"])
+        self._updates[key] = op
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        updates, self._updates = self._updates, {}
+        if not updates:
+            return
+
+        batches: Dict[str, list] = {}
+        for (name, _id), op in updates.items():
+            doc = {k: v for k, v in op.items() if v}
+            if doc:
+                batches.setdefault(name, []).append(((name, _id), UpdateOne({"_id": _id}, doc, upsert=True)))
+
+        for name, items in batches.items():
+            failed = range(len(items))
+            try:
+                await self._cols[name].bulk_write([req for _, req in items], ordered=False)
+                failed = []
+            except BulkWriteError as e:
+                # unordered: baaki ops lag chuke, sirf fail wale wapas
+                failed = sorted({err["index"] for err in e.details.get("writeErrors", [])})
+            except Exception:
+                pass
+            for i in failed:
+                key = items[i][0]
+                self._requeue(key, updates[key])
+            self.stats["written"] += len(items) - len(failed)
+            self.stats["failed"] += len(failed)
+        self.stats["flushes"] += 1
+
+    async def _run(self):
+        while self._updates:
+            await asyncio.sleep(self.flush_sec)
+            # close() is loop ko cancel kare to bhi chal raha bulk_write poora ho
+            await asyncio.shield(self.flush())
+
+    async def close(self):
+        # periodic loop band, phir lock chal rahe flush ka wait karke jo bacha wo likh do
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+
+_writes = _WriteBuffer(Config.DB_FLUSH_SEC, Config.DB_BATCH_SIZE)
+
+
+async def flush_db_writes():
+    """Shutdown pe queued writes Mongo me likh do."""
+    if USE_DB:
+        await _writes.close()
+
+
+def db_write_stats() -> Dict[str, int]:
+    return dict(_writes.stats)
+
+
 # ----------------------------------------------------
 #  User helpers
 # ----------------------------------------------------
@@ -95,17 +238,14 @@ async def get_or_create_user(user_id: int) -> Dict[str, Any]:
             user["stats"] = stats
             _mem_users[user_id] = user
             if USE_DB:
-                await _safe_db(
-                    users_col.update_one(
-                        {"_id": user_id},
-                        {
-                            "$set": {
-                                "stats.last_reset": today,
-                                "stats.daily_tasks": 0,
-                                "stats.daily_size_mb": 0.0,
-                            }
-                        },
-                    )
+                _writes.update(
+                    users_col,
+                    user_id,
+                    set_={
+                        "stats.last_reset": today,
+                        "stats.daily_tasks": 0,
+                        "stats.daily_size_mb": 0.0,
+                    },
                 )
 
     return user
@@ -124,20 +264,14 @@ async def update_user_stats(user_id: int, size_mb: float):
     _mem_users[user_id] = user
 
     if USE_DB:
-        await _safe_db(
-            users_col.update_one(
-                {"_id": user_id},
-                {
-                    "$inc": {
-                        "stats.daily_tasks": 1,
-                        "stats.daily_size_mb": float(size_mb),
-                    },
-                    "$set": {
-                        "stats.last_task_ts": datetime.datetime.utcnow(),
-                    },
-                },
-                upsert=True,
-            )
+        _writes.update(
+            users_col,
+            user_id,
+            inc={
+                "stats.daily_tasks": 1,
+                "stats.daily_size_mb": float(size_mb),
+            },
+            set_={"stats.last_task_ts": stats["last_task_ts"]},
         )
 
 
@@ -147,13 +281,7 @@ async def set_premium(user_id: int, value: bool = True):
     _mem_users[user_id] = user
 
     if USE_DB:
-        await _safe_db(
-            users_col.update_one(
-                {"_id": user_id},
-                {"$set": {"is_premium": value}},
-                upsert=True,
-            )
-        )
+        _writes.update(users_col, user_id, set_={"is_premium": value})
 
 
 async def set_ban(user_id: int, value: bool = True):
@@ -162,13 +290,7 @@ async def set_ban(user_id: int, value: bool = True):
     _mem_users[user_id] = user
 
     if USE_DB:
-        await _safe_db(
-            users_col.update_one(
-                {"_id": user_id},
-                {"$set": {"is_banned": value}},
-                upsert=True,
-            )
-        )
+        _writes.update(users_col, user_id, set_={"is_banned": value})
 
 
 async def is_banned(user_id: int) -> bool:
@@ -239,17 +361,17 @@ async def register_temp_path(user_id: int, path: str, ttl_min: int):
         "ttl_min": ttl_min,
     }
 
-    # DB
+    # DB: path hi _id, to same path dobara register = TTL refresh (upsert)
     if USE_DB:
-        await _safe_db(
-            files_col.insert_one(
-                {
-                    "user_id": user_id,
-                    "path": path,
-                    "created_at": now,
-                    "ttl_min": ttl_min,
-                }
-            )
+        _writes.update(
+            files_col,
+            path,
+            set_={
+                "user_id": user_id,
+                "path": path,
+                "created_at": now,
+                "ttl_min": ttl_min,
+            },
         )
 
 
@@ -289,3 +411,51 @@ async def get_expired_temp_paths(
 
     # unique paths only
     return list({p for p in expired_paths if p})
+
+
+# ----------------------------------------------------
+#  Uploaded file cache (content hash -> Telegram file_id)
+# ----------------------------------------------------
+
+async def get_cached_file(content_hash: str) -> Optional[Dict[str, Any]]:
+    """Same bytes pehle bheje ja chuke hain to {"file_id", "kind", "size"}."""
+    entry = _mem_file_cache.get(content_hash)
+    if entry is not None:
+        _mem_file_cache.move_to_end(content_hash)
+        return entry
+
+    if USE_DB:
+        doc = await _safe_db(file_cache_col.find_one({"_id": content_hash}))
+        if doc:
+            _mem_file_cache_put(content_hash, doc)
+            return doc
+
+    return None
+
+
+async def save_cached_file(content_hash: str, file_id: str, kind: str, size: int):
+    entry = {
+        "_id": content_hash,
+        "file_id": file_id,
+        "kind": kind,  # video / document
+        "size": size,
+        "updated_at": datetime.datetime.utcnow(),
+    }
+    _mem_file_cache_put(content_hash, entry)
+
+    if USE_DB:
+        await _safe_db(
+            file_cache_col.update_one(
+                {"_id": content_hash},
+                {"$set": entry},
+                upsert=True,
+            )
+        )
+
+
+async def drop_cached_file(content_hash: str):
+    # file_id invalid ho gaya (deleted / expired) -> agli baar fresh upload
+    _mem_file_cache.pop(content_hash, None)
+
+    if USE_DB:
+        await _safe_db(file_cache_col.delete_one({"_id": content_hash}))
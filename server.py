@@ -14,6 +14,10 @@ if str(BASE_DIR) not in sys.path:
 # Ab yaha se bot import karega
 from bot import app as tg_app  # pyrogram Client
 from utils.cleanup import cleanup_worker
+from utils.executor import shutdown_extract_pools
+from utils.http_client import start_http_client, close_http_client
+from utils.client_pool import client_pool
+from database import flush_db_writes
 
 
 fastapi_app = FastAPI(title="Serena Unzip Web Service")
@@ -24,15 +28,24 @@ async def on_startup():
     # background cleanup worker
     asyncio.create_task(cleanup_worker())
 
+    # shared HTTP connection pool
+    await start_http_client()
+
     # start Telegram bot client
     await tg_app.start()
+    await client_pool.start_helpers()
     print("Serena Unzip bot started (web service mode)")
 
 
 @fastapi_app.on_event("shutdown")
 async def on_shutdown():
-    # stop Telegram bot client
+    # stop helper bots + Telegram bot client
+    await client_pool.stop_helpers()
     await tg_app.stop()
+    # queued Mongo writes (user stats / flags / temp paths)
+    await flush_db_writes()
+    shutdown_extract_pools()
+    await close_http_client()
     print("Serena Unzip bot stopped")
 
 
@@ -0,0 +1,74 @@
+# tests/test_edit_dispatcher.py
+import asyncio
+
+from pyrogram.errors import FloodWait
+
+import utils.edit_dispatcher as ed
+
+
+class _Chat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class _Message:
+    """edit_text ka fake: pehli call pe FloodWait, baaki texts record."""
+
+    def __init__(self, chat_id=1, msg_id=1, flood=0, block=0.0):
+        self.chat = _Chat(chat_id)
+        self.id = msg_id
+        self._client = object()
+        self.flood = flood
+        self.block = block
+        self.sent = []
+
+    async def edit_text(self, text):
+        if self.block:
+            await asyncio.sleep(self.block)
+        if self.flood:
+            wait, self.flood = self.flood, 0
+            raise FloodWait(value=wait)
+        self.sent.append(text)
+
+
+def _dispatcher():
+    return ed.EditDispatcher(per_sec=100, chat_interval=0, msg_interval=0, tick=0.05)
+
+
+async def _drain(d, timeout=10):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    while d._task and not d._task.done() and loop.time() < end:
+        await asyncio.sleep(0.05)
+
+
+def test_edit_requeued_after_floodwait_is_delivered(monkeypatch):
+    # wait (value + 1 sec) STALE_SEC se lamba: pehle yahi edit stale ho ke drop hota tha
+    monkeypatch.setattr(ed, "STALE_SEC", 0.5)
+
+    async def main():
+        d = _dispatcher()
+        msg = _Message(flood=1)
+        d.submit(msg, lambda: "50%")
+        await _drain(d)
+        return d, msg
+
+    d, msg = asyncio.run(main())
+    assert msg.sent == ["50%"]
+    assert d.stats["flood"] == 1
+    assert d.stats["stale"] == 0
+
+
+def test_discard_cancels_inflight_edit():
+    async def main():
+        d = _dispatcher()
+        msg = _Message(block=0.5)
+        d.submit(msg, lambda: "10%")
+        await asyncio.sleep(0.2)  # edit ab in-flight hai
+        await d.settle(msg)
+        await asyncio.sleep(0.6)
+        return d, msg
+
+    d, msg = asyncio.run(main())
+    assert msg.sent == []
+    assert not d._inflight
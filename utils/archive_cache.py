@@ -0,0 +1,104 @@
+# utils/archive_cache.py
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+
+
+def cache_key(file_unique_id: str, password: Optional[str]) -> str:
+    # password plain store nahi karte, sirf hash
+    pw = hashlib.sha256((password or "").encode("utf-8")).hexdigest()[:16]
+    return f"{file_unique_id}:{pw}"
+
+
+class _ArchiveCache:
+    """
+    Archive manifest cache (file_unique_id + password hash -> listing,
+    link counts, aur already-uploaded outputs ke file_id). TTL + LRU.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry["created_at"] > self.ttl:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        manifest.setdefault("outputs", {})
+        manifest["created_at"] = time.time()
+        self._entries[key] = manifest
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return manifest
+
+    def record(
+        self,
+        key: Optional[str],
+        rel: str,
+        part: Optional[Tuple[int, int]],
+        kind: Optional[str],
+        file_id: Optional[str],
+    ):
+        """Output ka file_id manifest me; hits / LRU order nahi chhedta."""
+        manifest = self._entries.get(key) if key else None
+        if manifest is None or not kind or not file_id:
+            return
+        idx, total = (part[0] - 1, part[1]) if part else (0, 1)
+        slots: List[Any] = manifest["outputs"].get(rel) or []
+        if len(slots) != total:
+            slots = [None] * total
+        slots[idx] = (kind, file_id)
+        manifest["outputs"][rel] = slots
+
+    def drop(self, key: Optional[str]):
+        if key:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+archive_cache = _ArchiveCache(Config.ARCHIVE_CACHE_SIZE, Config.ARCHIVE_CACHE_TTL_H * 3600)
+
+
+def record_output(
+    key: Optional[str],
+    rel: str,
+    part: Optional[Tuple[int, int]],
+    kind: Optional[str],
+    file_id: Optional[str],
+):
+    """User ko gaya message (ya uska part) manifest me note karo."""
+    archive_cache.record(key, rel, part, kind, file_id)
+
+
+def cached_outputs(manifest: Optional[Dict[str, Any]], rel: str) -> Optional[List[Tuple[str, str]]]:
+    """rel ke saare parts ke (kind, file_id), koi bhi missing ho to None."""
+    if not manifest:
+        return None
+    slots = manifest["outputs"].get(rel)
+    if not slots or not all(slots):
+        return None
+    return slots
+
+
+def is_complete(manifest: Optional[Dict[str, Any]]) -> bool:
+    return bool(manifest) and all(
+        cached_outputs(manifest, rel) for rel in manifest["files"]
+    )
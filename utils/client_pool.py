@@ -0,0 +1,91 @@
+# utils/client_pool.py
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from pyrogram import Client
+
+from config import Config
+
+
+class ClientPool:
+    """
+    Upload fan-out: main bot + helper bots (HELPER_BOT_TOKENS).
+    Helper bots sirf staging (log) chat me upload karte hain, user ke chat
+    me copy hamesha main bot karta hai. Har upload us client pe jata hai
+    jiske paas abhi sabse kam uploads chal rahe hain.
+    """
+
+    def __init__(self):
+        self.main: Optional[Client] = None
+        self.helpers: List[Client] = []
+        self._load: Dict[int, int] = {}
+        self._done: Dict[int, int] = {}
+
+    def set_main(self, client: Client):
+        self.main = client
+
+    def has_helpers(self) -> bool:
+        return bool(self.helpers)
+
+    async def start_helpers(self, tokens: Optional[List[str]] = None):
+        tokens = Config.HELPER_BOT_TOKENS if tokens is None else tokens
+        for i, token in enumerate(tokens, start=1):
+            helper = Client(
+                f"serena_helper_{i}",
+                api_id=Config.API_ID,
+                api_hash=Config.API_HASH,
+                bot_token=token,
+                in_memory=True,
+                no_updates=True,
+                max_concurrent_transmissions=Config.TG_MAX_TRANSMISSIONS,
+            )
+            try:
+                await helper.start()
+            except Exception as e:
+                print(f"Helper bot #{i} start nahi hua: {e}")
+                continue
+            # log chat ka peer cache me (warna pehla upload PEER_ID_INVALID)
+            if Config.LOG_CHANNEL_ID:
+                try:
+                    await helper.get_chat(Config.LOG_CHANNEL_ID)
+                except Exception:
+                    pass
+            self.helpers.append(helper)
+
+    async def stop_helpers(self):
+        for helper in self.helpers:
+            try:
+                await helper.stop()
+            except Exception:
+                pass
+        self.helpers = []
+
+    @asynccontextmanager
+    async def uploader(self):
+        """Sabse kam load wala client (main bhi shamil)."""
+        clients = [c for c in [self.main, *self.helpers] if c is not None]
+        client = min(clients, key=lambda c: self._load.get(id(c), 0))
+        key = id(client)
+        self._load[key] = self._load.get(key, 0) + 1
+        try:
+            yield client
+        finally:
+            self._load[key] -= 1
+            self._done[key] = self._done.get(key, 0) + 1
+
+    def stats(self) -> List[Dict[str, int]]:
+        out = []
+        for i, c in enumerate([self.main, *self.helpers]):
+            if c is None:
+                continue
+            out.append(
+                {
+                    "index": i,  # 0 = main bot
+                    "active": self._load.get(id(c), 0),
+                    "done": self._done.get(id(c), 0),
+                }
+            )
+        return out
+
+
+client_pool = ClientPool()
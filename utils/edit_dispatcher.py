@@ -0,0 +1,196 @@
+# utils/edit_dispatcher.py
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from pyrogram.errors import FloodWait, MessageNotModified
+from pyrogram.types import Message
+
+from config import Config
+
+# itni der tak koi naya callback na aaye to pending edit purana (transfer
+# fail / cancel ho chuka), bhejne se caller ka "error" text overwrite hota
+STALE_SEC = 10
+# bhejne ke baad msg / chat timestamps itni der tak yaad rakho
+FORGET_SEC = 120
+
+_Key = Tuple[int, int]  # (chat_id, msg_id)
+
+
+class _Pending:
+    __slots__ = ("message", "render", "updated")
+
+    def __init__(self, message: Message, render: Callable[[], str], updated: float):
+        self.message = message
+        self.render = render
+        self.updated = updated
+
+
+class EditDispatcher:
+    """
+    Saare progress edits ek jagah se.
+
+    submit() sirf latest state record karta hai (same message ke purane
+    pending edit merge ho jate hain), ek background loop budget ke andar
+    edit bhejta hai:
+    - har message PROGRESS_UPDATE_INTERVAL me max 1 baar
+    - har chat EDIT_CHAT_INTERVAL me max 1 baar
+    - har bot EDIT_PER_SEC (token bucket)
+    Text same ho to edit skip; FloodWait pe wo chat (aur bot bucket) ruk jata hai.
+    Har edit alag task me jata hai, ek chat ka atka edit baaki chats ko nahi rokta.
+    """
+
+    def __init__(self, per_sec: float, chat_interval: float, msg_interval: float, tick: float = 0.25):
+        self.per_sec = max(0.1, per_sec)
+        self.chat_interval = max(0.0, chat_interval)
+        self.msg_interval = max(0.0, msg_interval)
+        self.tick = tick
+
+        self._pending: Dict[_Key, _Pending] = {}
+        self._last_text: Dict[_Key, str] = {}
+        self._msg_next: Dict[_Key, float] = {}
+        self._chat_next: Dict[int, float] = {}
+        self._buckets: Dict[int, list] = {}  # id(client) -> [tokens, ts]
+        # jin chats ka edit abhi chal raha hai (FloodWait me atka ho sakta hai)
+        self._inflight: Dict[int, Tuple[_Key, asyncio.Task]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "merged": 0,
+            "sent": 0,
+            "unchanged": 0,
+            "stale": 0,
+            "flood": 0,
+            "failed": 0,
+        }
+
+    # ---------- public API ----------
+
+    def submit(self, message: Message, render: Callable[[], str]):
+        """render() flush ke time call hota hai (latest state ka text)."""
+        key = (message.chat.id, message.id)
+        now = time.time()
+        self.stats["submitted"] += 1
+        p = self._pending.get(key)
+        if p is not None:
+            p.message, p.render, p.updated = message, render, now
+            self.stats["merged"] += 1
+        else:
+            self._pending[key] = _Pending(message, render, now)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def discard(self, message: Message):
+        """Transfer khatam: pending edit hatao, caller apna text likhega."""
+        key = (message.chat.id, message.id)
+        self._pending.pop(key, None)
+        self._last_text.pop(key, None)
+        self._msg_next.pop(key, None)
+        # chal raha / FloodWait me so raha progress edit baad me caller ka
+        # final text overwrite na kare
+        entry = self._inflight.get(key[0])
+        if entry is not None and entry[0] == key:
+            entry[1].cancel()
+
+    async def settle(self, message: Message):
+        """discard() + us message ka in-flight edit sach me ruk jaye tab tak wait."""
+        self.discard(message)
+        entry = self._inflight.get(message.chat.id)
+        if entry is not None and entry[0] == (message.chat.id, message.id):
+            await asyncio.gather(entry[1], return_exceptions=True)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # ---------- internals ----------
+
+    def _take_token(self, bot: int, now: float) -> bool:
+        tokens, ts = self._buckets.get(bot, (self.per_sec, now))
+        tokens = min(self.per_sec, tokens + (now - ts) * self.per_sec)
+        if tokens < 1:
+            self._buckets[bot] = [tokens, now]
+            return False
+        self._buckets[bot] = [tokens - 1, now]
+        return True
+
+    def _forget_old(self, now: float):
+        cutoff = now - FORGET_SEC
+        for key in [k for k, t in self._msg_next.items() if t < cutoff and k not in self._pending]:
+            self._msg_next.pop(key, None)
+            self._last_text.pop(key, None)
+        for chat in [c for c, t in self._chat_next.items() if t < cutoff]:
+            self._chat_next.pop(chat, None)
+
+    async def _send(self, key: _Key, p: _Pending):
+        chat_id = key[0]
+        try:
+            text = p.render()
+        except Exception:
+            self.stats["failed"] += 1
+            return
+        if self._last_text.get(key) == text:
+            self.stats["unchanged"] += 1
+            return
+
+        now = time.time()
+        self._chat_next[chat_id] = now + self.chat_interval
+        self._msg_next[key] = now + self.msg_interval
+        try:
+            await p.message.edit_text(text)
+            self._last_text[key] = text
+            self.stats["sent"] += 1
+        except MessageNotModified:
+            self._last_text[key] = text
+        except FloodWait as e:
+            self.stats["flood"] += 1
+            wait = float(e.value or 1) + 1
+            self._chat_next[chat_id] = time.time() + wait
+            self._buckets[id(p.message._client)] = [-self.per_sec * wait, time.time()]
+            # is beech naya state na aaya ho to yahi dobara try hoga (chat
+            # khulne tak stale nahi maana jata, dekho _flush_once)
+            self._pending.setdefault(key, p)
+        except Exception:
+            self.stats["failed"] += 1
+
+    async def _flush_once(self):
+        now = time.time()
+        # sabse purana edit pehle (fair across messages)
+        order = sorted(self._pending.items(), key=lambda kv: self._msg_next.get(kv[0], 0))
+        for key, p in order:
+            chat_id = key[0]
+            # FloodWait me ruki chat ka edit wait khatam hone se gino
+            if now - max(p.updated, self._chat_next.get(chat_id, 0)) > STALE_SEC:
+                self._pending.pop(key, None)
+                self.stats["stale"] += 1
+                continue
+            if chat_id in self._inflight:
+                continue
+            if self._msg_next.get(key, 0) > now or self._chat_next.get(chat_id, 0) > now:
+                continue
+            if not self._take_token(id(p.message._client), now):
+                continue
+            self._pending.pop(key, None)
+            task = asyncio.ensure_future(self._send(key, p))
+            self._inflight[chat_id] = (key, task)
+            task.add_done_callback(lambda _t, c=chat_id: self._inflight.pop(c, None))
+
+    async def _run(self):
+        # pending khatam hote hi loop ruk jata hai, agla submit phir chalu karega
+        last_gc = time.time()
+        while self._pending or self._inflight:
+            try:
+                await self._flush_once()
+            except Exception:
+                pass
+            await asyncio.sleep(self.tick)
+            if time.time() - last_gc > FORGET_SEC:
+                last_gc = time.time()
+                self._forget_old(last_gc)
+        self._forget_old(time.time())
+
+
+edit_dispatcher = EditDispatcher(
+    per_sec=Config.EDIT_PER_SEC,
+    chat_interval=Config.EDIT_CHAT_INTERVAL,
+    msg_interval=Config.PROGRESS_UPDATE_INTERVAL,
+)
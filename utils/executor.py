@@ -0,0 +1,267 @@
+# utils/executor.py
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from utils.extractors import (
+    _archive_type,
+    extract_archive,
+    list_archive,
+    ExtractionCancelled,
+)
+
+# CPU heavy inflate (deflate / lzma) -> process pool, baaki I/O bound -> thread pool
+CPU_BOUND_TYPES = {"zip", "7z"}
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_manager = None  # multiprocessing.Manager, process jobs ka shared state
+
+# progress(done, total) -> awaitable
+AsyncProgress = Callable[[int, int], Awaitable[Any]]
+
+
+def _get_pool(archive_type: Optional[str]):
+    global _process_pool, _thread_pool
+
+    if archive_type in CPU_BOUND_TYPES:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max(1, Config.EXTRACT_PROCESS_WORKERS)
+            )
+        return _process_pool
+
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=max(1, Config.EXTRACT_THREAD_WORKERS),
+            thread_name_prefix="extract",
+        )
+    return _thread_pool
+
+
+def _new_state(pool) -> Dict[str, Any]:
+    """
+    Job state: {"done", "total", "cancel"}.
+    Thread job ke liye plain dict kaafi hai, process job ke liye Manager proxy.
+    """
+    global _manager
+
+    initial = {"done": 0, "total": 0, "cancel": False}
+    if isinstance(pool, ProcessPoolExecutor):
+        if _manager is None:
+            _manager = multiprocessing.Manager()
+        return _manager.dict(initial)
+    return dict(initial)
+
+
+def _extract_job(
+    archive_path: str,
+    dest_dir: str,
+    password: Optional[str],
+    state,
+    members: Optional[List[str]] = None,
+    on_member: Optional[Callable[[str, str, Optional[str]], None]] = None,
+) -> Dict[str, Any]:
+    # worker process / thread ke andar chalta hai (picklable hona chahiye)
+    def progress(done: int, total: int):
+        state["done"] = done
+        state["total"] = total
+
+    return extract_archive(
+        archive_path,
+        dest_dir,
+        password=password,
+        progress=progress,
+        should_cancel=lambda: bool(state.get("cancel")),
+        members=members,
+        on_member=on_member,
+    )
+
+
+def _discard_output(dest_dir: str):
+    def _cb(_fut: Future):
+        shutil.rmtree(dest_dir, ignore_errors=True)
+
+    return _cb
+
+
+def _start_thread(fn, *args) -> Future:
+    """
+    Pipeline job apne daemon thread pe: ye poore upload tak chalta hai, shared
+    pool pe hota to run_list / dusre extracts ko starve karta.
+    """
+    cfut: Future = Future()
+
+    def _target():
+        if not cfut.set_running_or_notify_cancel():
+            return
+        try:
+            cfut.set_result(fn(*args))
+        except BaseException as e:
+            cfut.set_exception(e)
+
+    threading.Thread(target=_target, name="extract-pipe", daemon=True).start()
+    return cfut
+
+
+def _consume_result(fut: asyncio.Future):
+    # abandoned job ka error "never retrieved" warning na de
+    if not fut.cancelled():
+        fut.exception()
+
+
+async def run_extract(
+    archive_path: str,
+    dest_dir: str,
+    password: Optional[str] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    progress: Optional[AsyncProgress] = None,
+    members: Optional[List[str]] = None,
+    poll_interval: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    extract_archive ko worker pool me chalata hai, event loop block nahi hota.
+    progress(done, total) har poll pe await hota hai (bytes).
+    members diye ho to sirf wahi extract honge (on-demand single file).
+    cancel_check() True return kare to ExtractionCancelled raise hota hai;
+    queued job drop ho jata hai, running job agle chunk pe ruk jata hai
+    aur full extraction ka partial output delete ho jata hai.
+    """
+    pool = _get_pool(_archive_type(archive_path))
+    state = _new_state(pool)
+    cfut = pool.submit(_extract_job, archive_path, dest_dir, password, state, members)
+    fut = asyncio.wrap_future(cfut)
+    last_done = -1
+
+    while True:
+        done, _ = await asyncio.wait({fut}, timeout=poll_interval)
+        if done:
+            return fut.result()
+
+        if cancel_check and cancel_check():
+            state["cancel"] = True
+            fut.add_done_callback(_consume_result)
+            if not cfut.cancel() and members is None:
+                cfut.add_done_callback(_discard_output(dest_dir))
+            raise ExtractionCancelled("Extraction cancelled by user.")
+
+        if progress:
+            cur, total = state.get("done", 0), state.get("total", 0)
+            if total > 0 and cur != last_done:
+                last_done = cur
+                try:
+                    await progress(cur, total)
+                except Exception:
+                    pass
+
+
+async def iter_extract(
+    archive_path: str,
+    dest_dir: str,
+    password: Optional[str] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    progress: Optional[AsyncProgress] = None,
+    queue_size: Optional[int] = None,
+    poll_interval: float = 0.5,
+) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+    """
+    Pipelined extraction: har file complete hote hi (name, full_path, digest)
+    yield; digest = likhte waqt bana content hash (file_cache.note_hash ke liye) ya None.
+    Worker bounded queue pe block hota hai, to disk pe ek time pe sirf
+    kuch hi files hoti hain (consumer send karke delete kare).
+    Generator close / cancel hone par worker bhi ruk jata hai aur jo files
+    yield nahi hui (adhuri wali bhi) delete ho jati hain.
+    Callback worker thread me chalta hai, isliye thread (job ka apna).
+    Files dest_dir ke andar job ki private dir me aati hain, taaki cleanup
+    same dir me sendone wali files na chhede.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size or Config.PIPELINE_QUEUE_SIZE))
+    state = _new_state(None)
+    os.makedirs(dest_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=".pipe-", dir=dest_dir)
+
+    def on_member(name: str, path: str, digest: Optional[str]):
+        put = asyncio.run_coroutine_threadsafe(queue.put((name, path, digest)), loop)
+        # consumer chala gaya ho to put kabhi complete nahi hoga: cancel flag
+        # dekhte raho, warna thread yahin atka rehta
+        while True:
+            if state["cancel"]:
+                put.cancel()
+                raise ExtractionCancelled("Extraction cancelled by user.")
+            try:
+                put.result(timeout=poll_interval)
+                return
+            except concurrent.futures.TimeoutError:
+                continue
+
+    cfut = _start_thread(_extract_job, archive_path, work_dir, password, state, None, on_member)
+    fut = asyncio.wrap_future(cfut)
+    last_done = -1
+    finished = False
+
+    try:
+        while True:
+            if cancel_check and cancel_check():
+                raise ExtractionCancelled("Extraction cancelled by user.")
+
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, fut}, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+
+            if fut.done() and queue.empty():
+                fut.result()  # worker error yahi raise hoga
+                finished = True
+                return
+
+            if progress:
+                cur, total = state.get("done", 0), state.get("total", 0)
+                if total > 0 and cur != last_done:
+                    last_done = cur
+                    try:
+                        await progress(cur, total)
+                    except Exception:
+                        pass
+    finally:
+        state["cancel"] = True
+        # blocked put() ko chhuda do, worker next chunk pe cancel dekh lega
+        while not queue.empty():
+            queue.get_nowait()
+        if not fut.done():
+            fut.add_done_callback(_consume_result)
+        if not finished:
+            # beech me band: worker rukte hi bachi / adhuri files hatao. Normal
+            # end pe yield hui files consumer ki hain (upload ke baad delete).
+            cfut.add_done_callback(_discard_output(work_dir))
+
+
+async def run_list(archive_path: str, password: Optional[str] = None) -> Dict[str, Any]:
+    """list_archive thread pool me (headers read = I/O, tar.gz me thoda inflate)."""
+    pool = _get_pool(None)
+    return await asyncio.wrap_future(pool.submit(list_archive, archive_path, password))
+
+
+def shutdown_extract_pools():
+    global _process_pool, _thread_pool, _manager
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None
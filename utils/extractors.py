@@ -1,12 +1,16 @@
 # utils/extractors.py
+import hashlib
+import lzma
 import os
 import zipfile
+import zlib
 import tarfile
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Collection, List, Optional, Set, Tuple
 
 import py7zr
 import rarfile
+from py7zr.callbacks import ExtractCallback
 
 VIDEO_EXT = {".mp4", ".mkv", ".mov", ".avi", ".webm"}
 PDF_EXT = {".pdf"}
@@ -14,9 +18,26 @@ APK_EXT = {".apk", ".xapk", ".apks"}
 TXT_EXT = {".txt"}
 M3U_EXT = {".m3u", ".m3u8"}
 
+COPY_CHUNK = 1024 * 1024  # 1 MB
 
-def _scan_stats(base_dir: Path) -> Dict[str, Any]:
-    stats = {
+# progress(done_bytes, total_bytes), should_cancel() -> bool
+ProgressCallback = Callable[[int, int], None]
+CancelCheck = Callable[[], bool]
+# on_member(name, full_path, digest) -> har file poori disk pe likhne ke baad;
+# digest = likhte waqt bana "size:sha256" (file_cache.content_hash format) ya None
+MemberCallback = Callable[[str, str, Optional[str]], None]
+
+
+class ExtractionCancelled(Exception):
+    pass
+
+
+class WrongPassword(Exception):
+    pass
+
+
+def _empty_stats() -> Dict[str, int]:
+    return {
         "total_files": 0,
         "videos": 0,
         "pdf": 0,
@@ -26,6 +47,28 @@ def _scan_stats(base_dir: Path) -> Dict[str, Any]:
         "others": 0,
         "folders": 0,
     }
+
+
+def _count_file(stats: Dict[str, int], name: str):
+    stats["total_files"] += 1
+    ext = Path(name).suffix.lower()
+
+    if ext in VIDEO_EXT:
+        stats["videos"] += 1
+    elif ext in PDF_EXT:
+        stats["pdf"] += 1
+    elif ext in APK_EXT:
+        stats["apk"] += 1
+    elif ext in TXT_EXT:
+        stats["txt"] += 1
+    elif ext in M3U_EXT:
+        stats["m3u"] += 1
+    else:
+        stats["others"] += 1
+
+
+def _scan_stats(base_dir: Path) -> Dict[str, Any]:
+    stats = _empty_stats()
     files: List[str] = []
 
     for root, dirs, fls in os.walk(base_dir):
@@ -34,36 +77,28 @@ def _scan_stats(base_dir: Path) -> Dict[str, Any]:
             stats["folders"] += 1
 
         for f in fls:
-            stats["total_files"] += 1
             p = Path(root) / f
             rel_path = os.path.relpath(p, base_dir)
-            ext = p.suffix.lower()
-
-            if ext in VIDEO_EXT:
-                stats["videos"] += 1
-            elif ext in PDF_EXT:
-                stats["pdf"] += 1
-            elif ext in APK_EXT:
-                stats["apk"] += 1
-            elif ext in TXT_EXT:
-                stats["txt"] += 1
-            elif ext in M3U_EXT:
-                stats["m3u"] += 1
-            else:
-                stats["others"] += 1
-
+            _count_file(stats, rel_path)
             files.append(rel_path)
 
     return {"stats": stats, "files": files}
 
 
+def _norm_name(name: str) -> str:
+    """Archive member name ko 'a/b/c.ext' form me laata hai."""
+    n = name.replace("\\", "/")
+    while n.startswith("./"):
+        n = n[2:]
+    return n.strip("/")
+
+
 def _archive_type(path: str) -> Optional[str]:
     """
     Robust archive type detection based on suffixes and headers.
     Returns: 'zip' | 'tar' | '7z' | 'rar' | None
     """
     p = Path(path)
-    lower = str(p).lower()
     suffixes = "".join(p.suffixes).lower()
 
     # explicit suffix combos
@@ -141,45 +176,424 @@ def detect_encrypted(path: str) -> bool:
     return False
 
 
+def _check_zip_password(z: zipfile.ZipFile, infos: List[zipfile.ZipInfo], password: Optional[str]):
+    """
+    Zip central directory password nahi maangti, to galat password wala
+    listing bhi ban jata (aur cache ho jata). Sabse chhota encrypted member
+    poora padh ke check: header check byte + CRC dono.
+    """
+    encrypted = [i for i in infos if i.flag_bits & 0x1 and not i.is_dir()]
+    if not encrypted:
+        return
+    if not password:
+        raise WrongPassword("Archive password protected hai, password chahiye.")
+    smallest = min(encrypted, key=lambda i: i.compress_size)
+    try:
+        with z.open(smallest, pwd=password.encode("utf-8")) as f:
+            while f.read(1024 * 1024):
+                pass
+    except (RuntimeError, zipfile.BadZipFile) as e:
+        raise WrongPassword("Password galat hai.") from e
+
+
+def _check_7z_password(z: py7zr.SevenZipFile, password: Optional[str]):
+    """
+    7z me sirf data encrypted ho to listing galat password pe bhi ban jati
+    hai; extract tab "Corrupt input data" pe toot ta. Sabse chhota member
+    decompress karke check (solid block me usse pehle ka data bhi).
+    """
+    if not z.needs_password():
+        return
+    if not password:
+        raise WrongPassword("Archive password protected hai, password chahiye.")
+    files = [f for f in z.list() if not f.is_directory and f.uncompressed]
+    if not files:
+        return
+    smallest = min(files, key=lambda f: f.uncompressed)
+    try:
+        z.read([smallest.filename])
+    except (
+        lzma.LZMAError,
+        zlib.error,
+        OSError,
+        py7zr.exceptions.CrcError,
+        py7zr.exceptions.Bad7zFile,
+    ) as e:
+        raise WrongPassword("Password galat hai.") from e
+    finally:
+        z.reset()
+
+
+def _list_7z(archive_path: str, password: Optional[str]) -> List[Tuple[str, int, bool]]:
+    try:
+        z = py7zr.SevenZipFile(archive_path, mode="r", password=password)
+    except py7zr.exceptions.PasswordRequired as e:
+        raise WrongPassword("Archive password protected hai, password chahiye.") from e
+    except Exception:
+        # header encrypted + galat password -> header kachra decode hota hai;
+        # bina password PasswordRequired aaye to wahi wajah thi
+        if password:
+            try:
+                py7zr.SevenZipFile(archive_path, mode="r").close()
+            except py7zr.exceptions.PasswordRequired as e:
+                raise WrongPassword("Password galat hai.") from e
+            except Exception:
+                pass
+        raise
+    with z:
+        _check_7z_password(z, password)
+        return [(f.filename, f.uncompressed or 0, f.is_directory) for f in z.list()]
+
+
+def _check_rar_password(rf: rarfile.RarFile, password: Optional[str]):
+    """Rar bhi data-only encryption me listing deta hai; zip / 7z jaisa check."""
+    if not password and rf.needs_password():
+        # header encrypted: bina password listing hi khali
+        raise WrongPassword("Archive password protected hai, password chahiye.")
+    encrypted = [i for i in rf.infolist() if i.needs_password() and not i.isdir()]
+    if not encrypted:
+        return
+    if not password:
+        raise WrongPassword("Archive password protected hai, password chahiye.")
+    smallest = min(encrypted, key=lambda i: i.compress_size)
+    try:
+        with rf.open(smallest) as f:
+            while f.read(COPY_CHUNK):
+                pass
+    except (rarfile.RarWrongPassword, rarfile.RarCRCError, rarfile.BadRarFile) as e:
+        raise WrongPassword("Password galat hai.") from e
+
+
+def _list_entries(archive_path: str, password: Optional[str]) -> List[Tuple[str, int, bool]]:
+    """(name, size, is_dir) entries, bina extract kiye (headers / central directory)."""
+    t = _archive_type(archive_path)
+
+    if t == "zip":
+        with zipfile.ZipFile(archive_path) as z:
+            infos = z.infolist()
+            _check_zip_password(z, infos, password)
+            return [(i.filename, i.file_size, i.is_dir()) for i in infos]
+
+    if t == "tar":
+        # tar.gz me header padhne ke liye bhi decompress pass lagta hai, disk write nahi
+        with tarfile.open(archive_path, "r:*") as tfile:
+            return [
+                (m.name, m.size, m.isdir())
+                for m in tfile.getmembers()
+                if m.isdir() or m.isfile()
+            ]
+
+    if t == "7z":
+        return _list_7z(archive_path, password)
+
+    if t == "rar":
+        with rarfile.RarFile(archive_path) as rf:
+            if password:
+                try:
+                    rf.setpassword(password)  # header encrypted ho to yahin re-parse
+                except (rarfile.RarWrongPassword, rarfile.BadRarFile) as e:
+                    raise WrongPassword("Password galat hai.") from e
+            _check_rar_password(rf, password)
+            return [(i.filename, i.file_size, i.isdir()) for i in rf.infolist()]
+
+    raise ValueError("Unsupported archive format.")
+
+
+def list_archive(archive_path: str, password: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Archive ke andar kya hai, bina extract kiye.
+    Returns: { "stats": {...}, "files": [names], "sizes": {name: bytes}, "total_size": int }
+    names extract_archive(members=...) ke saath use ho sakte hain.
+    """
+    stats = _empty_stats()
+    files: List[str] = []
+    sizes: Dict[str, int] = {}
+    folders: Set[str] = set()
+
+    for raw_name, size, is_dir in _list_entries(archive_path, password):
+        name = _norm_name(raw_name)
+        if not name or name == ".":
+            continue
+        if ".." in name.split("/"):
+            continue
+        if is_dir:
+            folders.add(name)
+            continue
+
+        parent = name.rsplit("/", 1)[0] if "/" in name else ""
+        while parent:
+            folders.add(parent)
+            parent = parent.rsplit("/", 1)[0] if "/" in parent else ""
+
+        if name not in sizes:
+            files.append(name)
+            _count_file(stats, name)
+        sizes[name] = int(size or 0)
+
+    stats["folders"] = len(folders)
+    return {
+        "stats": stats,
+        "files": files,
+        "sizes": sizes,
+        "total_size": sum(sizes.values()),
+    }
+
+
+class _Reporter:
+    """
+    Per-member extraction ke bytes count karta hai, progress callback ko
+    feed karta hai, har chunk pe cancel flag check karta hai aur
+    file complete hone par on_member batata hai.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        progress: Optional[ProgressCallback],
+        should_cancel: Optional[CancelCheck],
+        on_member: Optional[MemberCallback] = None,
+    ):
+        self.total = total
+        self.done = 0
+        self.progress = progress
+        self.should_cancel = should_cancel
+        self.on_member = on_member
+
+    def check_cancel(self):
+        if self.should_cancel and self.should_cancel():
+            raise ExtractionCancelled("Extraction cancelled by user.")
+
+    def set(self, done: int):
+        self.done = done
+        if self.progress:
+            self.progress(min(self.done, self.total), self.total)
+
+    def add(self, n: int):
+        self.set(self.done + n)
+
+    def member_done(self, name: str, target: Path, digest: Optional[str] = None):
+        if self.on_member:
+            self.on_member(_norm_name(name), str(target), digest)
+
+
+def _safe_target(dest_dir: str, name: str) -> Optional[Path]:
+    """
+    Archive member name -> dest_dir ke andar ka path.
+    Absolute / '..' wale names (zip slip) ke liye None.
+    """
+    base = Path(dest_dir).resolve()
+    target = (base / name.lstrip("/\\")).resolve()
+    if target != base and base not in target.parents:
+        return None
+    return target
+
+
+def _copy_member(
+    src,
+    target: Path,
+    reporter: _Reporter,
+    on_chunk: Optional[Callable[[int], None]] = None,
+) -> Optional[str]:
+    """
+    src -> target copy. Pipeline (on_member) me saath hi sha256 banta hai,
+    taaki upload cache ke liye file dobara na padhni pade; "size:hex" return.
+    """
+    on_chunk = on_chunk or reporter.add
+    h = hashlib.sha256() if reporter.on_member else None
+    size = 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "wb") as dst:
+        while True:
+            reporter.check_cancel()
+            chunk = src.read(COPY_CHUNK)
+            if not chunk:
+                break
+            dst.write(chunk)
+            if h is not None:
+                h.update(chunk)
+                size += len(chunk)
+            on_chunk(len(chunk))
+    return f"{size}:{h.hexdigest()}" if h is not None else None
+
+
+def _wanted(wanted: Optional[Set[str]], name: str) -> bool:
+    return wanted is None or _norm_name(name) in wanted
+
+
+def _extract_zip(archive_path, dest_dir, password, wanted, reporter_factory):
+    with zipfile.ZipFile(archive_path) as z:
+        if password:
+            z.setpassword(password.encode("utf-8"))
+        members = [m for m in z.infolist() if _wanted(wanted, m.filename)]
+        reporter = reporter_factory(sum(m.file_size for m in members))
+        for info in members:
+            reporter.check_cancel()
+            target = _safe_target(dest_dir, info.filename)
+            if target is None:
+                continue
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            with z.open(info) as src:
+                digest = _copy_member(src, target, reporter)
+            reporter.member_done(info.filename, target, digest)
+
+
+def _extract_tar(archive_path, dest_dir, password, wanted, reporter_factory):
+    # stream mode (r|*): ek hi pass; progress = compressed bytes read
+    total = os.path.getsize(archive_path)
+    with open(archive_path, "rb") as raw:
+        reporter = reporter_factory(total)
+        # tar generally no password
+        with tarfile.open(fileobj=raw, mode="r|*") as tfile:
+            for member in tfile:
+                reporter.check_cancel()
+                target = _safe_target(dest_dir, member.name)
+                if target is None or not _wanted(wanted, member.name):
+                    reporter.set(raw.tell())
+                    continue
+                if member.isdir():
+                    target.mkdir(parents=True, exist_ok=True)
+                elif member.isfile():
+                    src = tfile.extractfile(member)
+                    if src is not None:
+                        digest = _copy_member(
+                            src, target, reporter, on_chunk=lambda _n: reporter.set(raw.tell())
+                        )
+                        reporter.member_done(member.name, target, digest)
+                # links / devices skip (safe side)
+                reporter.set(raw.tell())
+
+
+class _SevenZipProgress(ExtractCallback):
+    """py7zr reporter thread se bytes progress."""
+
+    def __init__(self, reporter: _Reporter):
+        self.reporter = reporter
+
+    def report_start_preparation(self):
+        pass
+
+    def report_start(self, processing_file_path, processing_bytes):
+        pass
+
+    def report_update(self, decompressed_bytes):
+        try:
+            self.reporter.add(int(decompressed_bytes))
+        except Exception:
+            pass
+
+    def report_end(self, processing_file_path, wrote_bytes):
+        pass
+
+    def report_warning(self, message):
+        pass
+
+    def report_postprocess(self):
+        pass
+
+
+def _extract_7z(archive_path, dest_dir, password, wanted, reporter_factory):
+    with py7zr.SevenZipFile(archive_path, mode="r", password=password) as z:
+        if wanted is not None:
+            # selective extract: py7zr ko original names chahiye
+            targets = [n for n in z.getnames() if _norm_name(n) in wanted]
+            reporter = reporter_factory(0)
+            reporter.check_cancel()
+            if targets:
+                z.extract(dest_dir, targets=targets)
+            return
+
+        info = z.archiveinfo()
+        reporter = reporter_factory(info.uncompressed or 0)
+        reporter.check_cancel()
+
+        if reporter.on_member and not info.solid:
+            # non-solid: ek ek file nikaalo, taaki pipeline backpressure de sake
+            for f in z.list():
+                reporter.check_cancel()
+                target = _safe_target(dest_dir, f.filename)
+                if f.is_directory or target is None:
+                    continue
+                z.reset()
+                z.extract(dest_dir, targets=[f.filename])
+                reporter.add(f.uncompressed or 0)
+                if target.is_file():
+                    reporter.member_done(f.filename, target)
+            return
+
+        # solid archive me per-file extract O(n^2) hota hai, isliye extractall.
+        # py7zr member-level write hook nahi deta; cancel extractall ke baad check
+        # hota hai aur on_member bhi poora extract hone ke baad hi milta hai.
+        z.extractall(dest_dir, callback=_SevenZipProgress(reporter))
+        names = [f.filename for f in z.list() if not f.is_directory]
+    reporter.check_cancel()
+
+    if reporter.on_member:
+        for name in names:
+            target = _safe_target(dest_dir, name)
+            if target is not None and target.is_file():
+                reporter.check_cancel()
+                reporter.member_done(name, target)
+
+
+def _extract_rar(archive_path, dest_dir, password, wanted, reporter_factory):
+    with rarfile.RarFile(archive_path) as rf:
+        if password:
+            rf.setpassword(password)
+        members = [m for m in rf.infolist() if _wanted(wanted, m.filename)]
+        reporter = reporter_factory(sum(m.file_size for m in members))
+        for info in members:
+            reporter.check_cancel()
+            target = _safe_target(dest_dir, info.filename)
+            if target is None:
+                continue
+            if info.isdir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            with rf.open(info) as src:
+                digest = _copy_member(src, target, reporter)
+            reporter.member_done(info.filename, target, digest)
+
+
+_EXTRACTORS = {
+    "zip": _extract_zip,
+    "tar": _extract_tar,
+    "7z": _extract_7z,
+    "rar": _extract_rar,
+}
+
+
 def extract_archive(
     archive_path: str,
     dest_dir: str,
     password: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    should_cancel: Optional[CancelCheck] = None,
+    members: Optional[Collection[str]] = None,
+    on_member: Optional[MemberCallback] = None,
 ) -> Dict[str, Any]:
     """
-    Extracts archive to dest_dir.
+    Extracts archive to dest_dir, member by member.
     Supports: zip, rar, 7z, tar, tar.gz, tgz, tar.bz2, tbz2, gz, bz2
+    progress(done, total) har chunk ke baad call hota hai (bytes);
+    should_cancel() True ho to ExtractionCancelled raise hota hai.
+    members diye ho (list_archive wale names) to sirf wahi extract honge.
+    on_member(name, path, digest) har file complete hone par (isi thread me) call
+    hota hai; digest zip / tar / rar me likhte waqt bana hash, 7z me None.
     Returns: { "stats": {...}, "files": [relative paths] }
     """
     Path(dest_dir).mkdir(parents=True, exist_ok=True)
     t = _archive_type(archive_path)
 
-    if t is None:
+    extractor = _EXTRACTORS.get(t)
+    if extractor is None:
         raise ValueError("Unsupported archive format.")
 
-    if t == "zip":
-        with zipfile.ZipFile(archive_path) as z:
-            if password:
-                z.setpassword(password.encode("utf-8"))
-            z.extractall(dest_dir)
-
-    elif t == "tar":
-        # tarfile automatically handles .tar, .tar.gz, .tgz, .tar.bz2 etc.
-        with tarfile.open(archive_path, "r:*") as tfile:
-            # tar generally no password
-            tfile.extractall(dest_dir)
-
-    elif t == "7z":
-        with py7zr.SevenZipFile(archive_path, mode="r", password=password) as z:
-            z.extractall(dest_dir)
+    def reporter_factory(total: int) -> _Reporter:
+        return _Reporter(total, progress, should_cancel, on_member)
 
-    elif t == "rar":
-        with rarfile.RarFile(archive_path) as rf:
-            if password:
-                rf.setpassword(password)
-            rf.extractall(dest_dir)
-
-    else:
-        raise ValueError("Unsupported archive format.")
+    wanted = {_norm_name(m) for m in members} if members is not None else None
+    extractor(archive_path, dest_dir, password, wanted, reporter_factory)
 
     return _scan_stats(Path(dest_dir))
@@ -0,0 +1,198 @@
+# utils/file_cache.py
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from pyrogram import Client
+from pyrogram.errors import (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    FloodWait,
+    MediaEmpty,
+    MediaInvalid,
+)
+from pyrogram.types import Message
+
+from database import drop_cached_file, get_cached_file, save_cached_file
+
+HASH_CHUNK = 1024 * 1024
+# write ke saath bane hash (extract / download loop) itne paths tak yaad
+KNOWN_MAX = 2048
+
+# same path ka hash already ban raha ho (prewarm + upload) to usi ka wait
+_inflight: Dict[str, asyncio.Future] = {}
+stats: Dict[str, int] = {"hits": 0, "misses": 0, "stale": 0}
+# path -> (size, mtime_ns, key); file badli ho to entry bekaar
+_known: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+
+# sirf inse pata chalta hai ki file_id hi bekaar hai; network / FloodWait
+# jaise errors pe entry rakho (caller normal upload karega / retry)
+STALE_ERRORS = (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+    MediaInvalid,
+)
+
+
+class StreamHash:
+    """Bytes likhte waqt hi sha256, taaki upload se pehle file dobara na padhni pade."""
+
+    __slots__ = ("_h", "size")
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk: bytes):
+        self._h.update(chunk)
+        self.size += len(chunk)
+
+    def key(self) -> str:
+        return f"{self.size}:{self._h.hexdigest()}"
+
+
+def note_hash(path: str, key: Optional[str]):
+    """Likhte waqt bana "size:hex" key; content_hash() isi ko lautayega."""
+    if not key:
+        return
+    try:
+        st = os.stat(path)
+    except OSError:
+        return
+    _known[path] = (st.st_size, st.st_mtime_ns, key)
+    _known.move_to_end(path)
+    while len(_known) > KNOWN_MAX:
+        _known.popitem(last=False)
+
+
+def _known_hash(path: str) -> Optional[str]:
+    entry = _known.get(path)
+    if entry is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+    if st is None or (st.st_size, st.st_mtime_ns) != entry[:2]:
+        _known.pop(path, None)
+        return None
+    return entry[2]
+
+
+def _sha256_sync(path: str) -> str:
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+            size += len(chunk)
+    return f"{size}:{h.hexdigest()}"
+
+
+async def content_hash(path: str) -> str:
+    """Streaming sha256 (thread me) -> "size:hex" cache key."""
+    known = _known_hash(path)
+    if known:
+        return known
+    fut = _inflight.get(path)
+    if fut is None:
+        fut = asyncio.ensure_future(asyncio.to_thread(_sha256_sync, path))
+        _inflight[path] = fut
+        fut.add_done_callback(lambda _f: _inflight.pop(path, None))
+    return await asyncio.shield(fut)
+
+
+async def prehash(path: str):
+    """Upload se pehle background me hash, taaki upload ke time ready ho."""
+    try:
+        await content_hash(path)
+    except Exception:
+        pass
+
+
+def _scoped(client: Client, key: str) -> str:
+    # file_id har bot ke liye alag hota hai (helper bots), isliye bot id prefix
+    me = getattr(client, "me", None)
+    return f"{getattr(me, 'id', 0)}:{key}"
+
+
+def media_of(msg: Message):
+    """(kind, media) -> kind = video / document / audio."""
+    if msg.video:
+        return "video", msg.video
+    if msg.document:
+        return "document", msg.document
+    if msg.audio:
+        return "audio", msg.audio
+    return None, None
+
+
+async def send_file_id(
+    client: Client,
+    chat_id: int,
+    kind: Optional[str],
+    file_id: str,
+    caption: str,
+    reply_to: Optional[int] = None,
+) -> Message:
+    send = getattr(client, f"send_{kind}" if kind in ("video", "audio") else "send_document")
+    return await send(chat_id, file_id, caption=caption, reply_to_message_id=reply_to)
+
+
+async def send_cached(
+    client: Client,
+    chat_id: int,
+    key: str,
+    caption: str,
+    reply_to: Optional[int] = None,
+) -> Optional[Message]:
+    """
+    Cache me file_id mila to upload ke bina wahi bhej do.
+    file_id invalid ho to entry hata ke None (caller normal upload kare);
+    FloodWait upar jata hai, baaki errors pe entry rehti hai aur None.
+    """
+    key = _scoped(client, key)
+    entry = await get_cached_file(key)
+    if not entry:
+        stats["misses"] += 1
+        return None
+
+    try:
+        msg = await send_file_id(
+            client, chat_id, entry.get("kind"), entry["file_id"], caption, reply_to
+        )
+    except STALE_ERRORS:
+        stats["stale"] += 1
+        await drop_cached_file(key)
+        return None
+    except FloodWait:
+        raise
+    except Exception:
+        return None
+
+    stats["hits"] += 1
+    return msg
+
+
+async def remember(client: Client, key: str, msg: Optional[Message]):
+    if msg is None:
+        return
+    key = _scoped(client, key)
+    kind, media = media_of(msg)
+    if media is None:
+        return
+    await save_cached_file(key, media.file_id, kind, getattr(media, "file_size", 0) or 0)
+
+
+def file_cache_stats() -> Dict[str, Any]:
+    return dict(stats)
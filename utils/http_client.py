@@ -0,0 +1,50 @@
+# utils/http_client.py
+from typing import Optional
+
+import aiohttp
+
+from config import Config
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _new_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=Config.HTTP_POOL_LIMIT,
+        limit_per_host=Config.HTTP_POOL_PER_HOST,
+        ttl_dns_cache=Config.HTTP_DNS_TTL,
+        keepalive_timeout=Config.HTTP_KEEPALIVE_SEC,
+        enable_cleanup_closed=True,
+    )
+    # total=None: badi files ghanton chal sakti hain, sirf connect/read stall pe timeout
+    timeout = aiohttp.ClientTimeout(
+        total=None,
+        sock_connect=Config.HTTP_CONNECT_TIMEOUT,
+        sock_read=Config.HTTP_READ_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def start_http_client():
+    """Startup pe ek shared session (warm connections + DNS cache sab links ke liye)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _new_session()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Shared session. start_http_client() se pehle call ho (scripts / tests)
+    to lazily bana deta hai.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _new_session()
+    return _session
+
+
+async def close_http_client():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -1,12 +1,18 @@
 # utils/http_downloader.py
+import asyncio
+import hashlib
+import json
 import os
 import re
 import time
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import aiohttp
 from pyrogram.types import Message
 
+from config import Config
+from utils.file_cache import StreamHash, note_hash
+from utils.http_client import get_session
 from utils.progress import progress_for_pyrogram
 
 
@@ -33,6 +39,198 @@ def _filename_from_cd(cd: str) -> Optional[str]:
     return None
 
 
+def _guess_name(url: str, cd: str, dest_path: str, file_name: Optional[str]) -> str:
+    header_name = _filename_from_cd(cd)
+
+    # Guess base filename
+    if header_name:
+        return header_name
+
+    # from URL
+    base_from_url = url.split("?", 1)[0].split("#", 1)[0].rsplit("/", 1)[-1]
+    if base_from_url:
+        return base_from_url
+    return file_name or os.path.basename(dest_path) or "file"
+
+
+class _Probe:
+    __slots__ = ("url", "total", "ranges", "cd", "etag", "last_modified")
+
+    def __init__(self, url: str, total: int, ranges: bool, headers):
+        self.url = url
+        self.total = total
+        self.ranges = ranges
+        self.cd = headers.get("Content-Disposition", "")
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+
+
+class _RangeNotSupported(Exception):
+    pass
+
+
+class IncompleteDownload(aiohttp.ClientPayloadError):
+    pass
+
+
+# retry in errors pe (resume checkpoint se)
+RETRY_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)
+# 4xx pe retry bekaar (dead / forbidden link), bas ye do temporary hain
+RETRY_4XX = (408, 429)
+
+
+def _permanent(e: BaseException) -> bool:
+    return (
+        isinstance(e, aiohttp.ClientResponseError)
+        and 400 <= e.status < 500
+        and e.status not in RETRY_4XX
+    )
+
+
+async def _probe(session: aiohttp.ClientSession, url: str) -> Optional[_Probe]:
+    """
+    Range request (bytes=0-0) se check: server ranges deta hai ya nahi,
+    total size kitna hai, redirect ke baad final URL kya hai.
+    HEAD kai hosts pe broken hota hai, isliye tiny GET.
+    """
+    try:
+        async with session.get(url, headers={"Range": "bytes=0-0"}) as resp:
+            if resp.status not in (200, 206):
+                return None
+            final_url = str(resp.url)
+            if resp.status == 206:
+                m = re.search(r"/(\d+)\s*$", resp.headers.get("Content-Range", ""))
+                total = int(m.group(1)) if m else 0
+                return _Probe(final_url, total, total > 0, resp.headers)
+            # 200 = range ignore kiya, body padhe bina close
+            total = int(resp.headers.get("Content-Length") or 0)
+            return _Probe(final_url, total, False, resp.headers)
+    except aiohttp.ClientError:
+        return None
+
+
+# ----------------- resume checkpoints -----------------
+
+
+def _part_paths(dest_dir: str, url: str):
+    """<dest_dir>/<sha1(url)>.part + .part.json sidecar (restart ke baad bhi same)."""
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+    part = os.path.join(dest_dir, key + ".part")
+    return part, part + ".json"
+
+
+def _load_checkpoint(ckpt_path: str, part_path: str, url: str, probe: _Probe) -> Optional[Dict[str, Any]]:
+    """Sidecar tabhi valid hai jab URL, size aur ETag/Last-Modified match karein."""
+    try:
+        with open(ckpt_path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if ckpt.get("url") != url or ckpt.get("total") != probe.total:
+        return None
+    if ckpt.get("etag") and probe.etag and ckpt["etag"] != probe.etag:
+        return None
+    if (
+        ckpt.get("last_modified")
+        and probe.last_modified
+        and ckpt["last_modified"] != probe.last_modified
+    ):
+        return None
+    if not os.path.isfile(part_path) or os.path.getsize(part_path) != probe.total:
+        return None
+    return ckpt
+
+
+def _save_checkpoint(ckpt_path: str, ckpt: Dict[str, Any]):
+    tmp = ckpt_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, ckpt_path)
+
+
+def _new_checkpoint(url: str, probe: _Probe, fname: str, segments: int) -> Dict[str, Any]:
+    total = probe.total
+    seg_size = -(-total // segments)  # ceil
+    return {
+        "url": url,
+        "etag": probe.etag,
+        "last_modified": probe.last_modified,
+        "total": total,
+        "name": fname,
+        # [start, end, done_bytes]
+        "ranges": [
+            [start, min(start + seg_size, total) - 1, 0]
+            for start in range(0, total, seg_size)
+        ],
+    }
+
+
+async def _download_ranges(
+    session: aiohttp.ClientSession,
+    url: str,
+    part_path: str,
+    ckpt_path: str,
+    ckpt: Dict[str, Any],
+    chunk_size: int,
+    on_progress,
+):
+    """
+    Har range apni offset se (start + done) parallel fetch hoti hai aur
+    preallocated .part file me likhi jati hai. Range map thodi thodi der me
+    sidecar me save hota hai, taaki fail / restart ke baad wahi se resume ho.
+    """
+    last_save = time.time()
+    # har range ka open handle: sidecar save se pehle flush, warna buffer me
+    # pade bytes "done" likh jate aur crash ke baad resume unhe skip karta
+    handles = set()
+
+    def checkpoint(force: bool = False):
+        nonlocal last_save
+        if force or time.time() - last_save >= Config.HTTP_CHECKPOINT_SEC:
+            last_save = time.time()
+            for f in handles:
+                f.flush()
+            _save_checkpoint(ckpt_path, ckpt)
+
+    async def fetch(rng):
+        start, end, done = rng
+        if start + done > end:
+            return
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        if ckpt.get("etag"):
+            headers["If-Range"] = ckpt["etag"]
+        async with session.get(url, headers=headers) as resp:
+            if resp.status != 206:
+                raise _RangeNotSupported(f"HTTP {resp.status} for range request")
+            with open(part_path, "r+b") as f:
+                handles.add(f)
+                try:
+                    f.seek(start + done)
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        rng[2] += len(chunk)
+                        checkpoint()
+                        await on_progress(len(chunk))
+                finally:
+                    handles.discard(f)
+        if start + rng[2] <= end:
+            raise IncompleteDownload(
+                f"Segment {start}-{end} incomplete ({rng[2]} bytes)"
+            )
+
+    tasks = [asyncio.create_task(fetch(rng)) for rng in ckpt["ranges"]]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        checkpoint(force=True)
+
+
 async def download_file(
     url: str,
     dest_path: str,
@@ -41,66 +239,179 @@ async def download_file(
     status_message: Optional[Message] = None,
     file_name: Optional[str] = None,
     direction: str = "from web",
+    segments: Optional[int] = None,
+    retries: Optional[int] = None,
 ) -> str:
     """
     HTTP downloader with optional Telegram-style progress bar.
+    Server Range support kare to: badi file N connections pe parallel
+    segments me, sidecar checkpoint ke saath; network error pe exponential
+    backoff se retry aur jitna aa chuka hai wahan se resume (bot restart ke
+    baad bhi, jab tak dest_dir delete na ho). Warna single stream.
 
     Returns: final saved file path (with proper filename if server sends it).
     """
     dest_dir = os.path.dirname(dest_path) or "."
     os.makedirs(dest_dir, exist_ok=True)
+    segments = segments or Config.HTTP_SEGMENTS
+    retries = Config.HTTP_RETRIES if retries is None else retries
+    part_path, ckpt_path = _part_paths(dest_dir, url)
 
-    timeout_cfg = aiohttp.ClientTimeout(total=timeout)
-    async with aiohttp.ClientSession(timeout=timeout_cfg) as session:
-        async with session.get(url) as resp:
-            resp.raise_for_status()
-            total = int(resp.headers.get("Content-Length") or 0)
-            cd = resp.headers.get("Content-Disposition", "")
-
-            header_name = _filename_from_cd(cd)
-
-            # Guess base filename
-            if header_name:
-                fname = header_name
-            else:
-                # from URL
-                base_from_url = url.split("?", 1)[0].split("#", 1)[0].rsplit("/", 1)[-1]
-                if base_from_url:
-                    fname = base_from_url
-                else:
-                    fname = file_name or os.path.basename(dest_path) or "file"
-
-            final_path = os.path.join(dest_dir, fname)
-
-            downloaded = 0
-            start = time.time()
-
-            with open(final_path, "wb") as f:
-                async for chunk in resp.content.iter_chunked(chunk_size):
-                    if not chunk:
-                        continue
-                    f.write(chunk)
-                    downloaded += len(chunk)
-
-                    if status_message and total > 0:
-                        await progress_for_pyrogram(
-                            downloaded,
-                            total,
-                            status_message,
-                            start,
-                            fname,
-                            direction,
-                        )
-
-            # final 100% update agar total > 0
-            if status_message and total > 0 and downloaded == total:
-                await progress_for_pyrogram(
-                    downloaded,
-                    total,
+    session = get_session()
+    # timeout = poori download (retries samet) ka upper limit
+    async with asyncio.timeout(timeout):
+        attempt = 0
+        while True:
+            try:
+                return await _download_once(
+                    session,
+                    url,
+                    dest_path,
+                    part_path,
+                    ckpt_path,
+                    chunk_size,
                     status_message,
-                    start,
-                    fname,
+                    file_name,
                     direction,
+                    segments,
                 )
+            except RETRY_ERRORS as e:
+                attempt += 1
+                if attempt > retries or _permanent(e):
+                    raise
+                await asyncio.sleep(min(Config.HTTP_RETRY_BASE_SEC * 2 ** (attempt - 1), 60))
+
+
+async def _download_once(
+    session: aiohttp.ClientSession,
+    url: str,
+    dest_path: str,
+    part_path: str,
+    ckpt_path: str,
+    chunk_size: int,
+    status_message: Optional[Message],
+    file_name: Optional[str],
+    direction: str,
+    segments: int,
+) -> str:
+    dest_dir = os.path.dirname(dest_path) or "."
+    probe = await _probe(session, url)
+    if probe is None or not probe.ranges:
+        return await _download_single(
+            session, url, dest_path, part_path, chunk_size, status_message, file_name, direction
+        )
+
+    ckpt = _load_checkpoint(ckpt_path, part_path, url, probe)
+    if ckpt is None:
+        fname = _guess_name(url, probe.cd, dest_path, file_name)
+        big = probe.total >= Config.HTTP_SEGMENT_MIN_MB * 1024 * 1024
+        ckpt = _new_checkpoint(url, probe, fname, segments if big else 1)
+        with open(part_path, "wb") as f:
+            f.truncate(probe.total)
+        _save_checkpoint(ckpt_path, ckpt)
+
+    fname = ckpt["name"]
+    final_path = os.path.join(dest_dir, fname)
+    downloaded = sum(r[2] for r in ckpt["ranges"])
+    start = time.time()
+
+    async def on_progress(n: int):
+        nonlocal downloaded
+        downloaded += n
+        if status_message:
+            await progress_for_pyrogram(
+                downloaded,
+                probe.total,
+                status_message,
+                start,
+                fname,
+                direction,
+            )
+
+    try:
+        await _download_ranges(session, probe.url, part_path, ckpt_path, ckpt, chunk_size, on_progress)
+    except _RangeNotSupported:
+        # server ne beech me range dena band kar diya -> fresh single stream
+        _remove_quiet(ckpt_path)
+        return await _download_single(
+            session, url, dest_path, part_path, chunk_size, status_message, file_name, direction
+        )
+
+    # final size validate
+    if os.path.getsize(part_path) != probe.total or any(
+        r[0] + r[2] <= r[1] for r in ckpt["ranges"]
+    ):
+        raise IncompleteDownload("Downloaded size does not match Content-Range total.")
+
+    os.replace(part_path, final_path)
+    _remove_quiet(ckpt_path)
+    return final_path
+
+
+def _remove_quiet(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def _download_single(
+    session: aiohttp.ClientSession,
+    url: str,
+    dest_path: str,
+    part_path: str,
+    chunk_size: int,
+    status_message: Optional[Message],
+    file_name: Optional[str],
+    direction: str,
+) -> str:
+    # no range support -> resume possible nahi, retry pe shuru se
+    dest_dir = os.path.dirname(dest_path) or "."
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        total = int(resp.headers.get("Content-Length") or 0)
+        cd = resp.headers.get("Content-Disposition", "")
+
+        fname = _guess_name(url, cd, dest_path, file_name)
+        final_path = os.path.join(dest_dir, fname)
+
+        downloaded = 0
+        start = time.time()
+        # sequential stream: upload cache ka hash yahin, file dobara padhe bina
+        digest = StreamHash()
+
+        with open(part_path, "wb") as f:
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                digest.update(chunk)
+                downloaded += len(chunk)
+
+                if status_message and total > 0:
+                    await progress_for_pyrogram(
+                        downloaded,
+                        total,
+                        status_message,
+                        start,
+                        fname,
+                        direction,
+                    )
+
+    if total > 0 and downloaded != total:
+        raise IncompleteDownload(f"Got {downloaded} of {total} bytes.")
+
+    # final 100% update agar total > 0
+    if status_message and total > 0:
+        await progress_for_pyrogram(
+            downloaded,
+            total,
+            status_message,
+            start,
+            fname,
+            direction,
+        )
 
+    os.replace(part_path, final_path)
+    note_hash(final_path, digest.key())
     return final_path
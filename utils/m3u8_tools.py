@@ -1,21 +1,117 @@
 # utils/m3u8_tools.py
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
 import aiohttp
 import m3u8
-from typing import List, Dict
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import unpad
 
-from utils.media_tools import run_ffmpeg
+from config import Config
+from utils.http_client import get_session
+from utils.media_tools import PRIO_LONG, run_ffmpeg
 
+# progress(done, total) -> awaitable
+AsyncProgress = Callable[[int, int], Awaitable[Any]]
 
-async def _fetch_m3u8(url: str) -> m3u8.M3U8:
+
+class _PlaylistEntry:
+    __slots__ = ("playlist", "etag", "last_modified", "expires_at")
+
+    def __init__(self, playlist, etag, last_modified, expires_at):
+        self.playlist = playlist
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+
+class _PlaylistCache:
     """
-    Fetch m3u8 content asynchronously and parse with m3u8 lib.
+    Parsed master/media playlists ka TTL + LRU cache (URL key).
+    TTL ke baad entry turant drop nahi hoti: ETag / Last-Modified ke saath
+    conditional GET hota hai, 304 aaye to wahi parsed playlist reuse.
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _PlaylistEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def _ttl_for(self, playlist: m3u8.M3U8) -> float:
+        # live media playlist (ENDLIST nahi) har target duration pe badalti hai
+        if playlist.segments and not playlist.is_endlist and playlist.target_duration:
+            return min(self.ttl, float(playlist.target_duration))
+        return self.ttl
+
+    def _store(self, url: str, entry: _PlaylistEntry):
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, url: str) -> m3u8.M3U8:
+        entry = self._entries.get(url)
+        now = time.time()
+        if entry is not None:
+            self._entries.move_to_end(url)
+            if now < entry.expires_at:
+                self.hits += 1
+                return entry.playlist
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        async with get_session().get(url, headers=headers) as resp:
+            if resp.status == 304 and entry is not None:
+                self.revalidated += 1
+                entry.expires_at = now + self._ttl_for(entry.playlist)
+                return entry.playlist
             resp.raise_for_status()
             text = await resp.text()
-    # uri param: base url for relative playlist/segment urls
-    return m3u8.loads(text, uri=url)
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+
+        self.misses += 1
+        # uri param: base url for relative playlist/segment urls
+        playlist = m3u8.loads(text, uri=url)
+        self._store(
+            url,
+            _PlaylistEntry(playlist, etag, last_modified, now + self._ttl_for(playlist)),
+        )
+        return playlist
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+        }
+
+
+_playlist_cache = _PlaylistCache(Config.M3U8_CACHE_SIZE, Config.M3U8_CACHE_TTL)
+
+
+async def _fetch_m3u8(url: str) -> m3u8.M3U8:
+    """
+    Fetch m3u8 content asynchronously and parse with m3u8 lib.
+    Quality menu aur downloader dono isi cache se padhte hain.
+    """
+    return await _playlist_cache.get(url)
+
+
+def playlist_cache_stats() -> Dict[str, int]:
+    return _playlist_cache.stats()
 
 
 async def get_m3u8_variants(url: str) -> List[Dict[str, str]]:
@@ -53,10 +149,244 @@ async def get_m3u8_variants(url: str) -> List[Dict[str, str]]:
     return variants
 
 
-async def download_m3u8_stream(src_url: str, dest_path: str):
+class HLSError(RuntimeError):
+    pass
+
+
+# retry in errors pe (per segment)
+SEGMENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)
+
+
+def _pick_variant(playlist: m3u8.M3U8) -> str:
+    # master playlist mila -> sabse high bandwidth wala
+    best = max(
+        playlist.playlists,
+        key=lambda pl: (pl.stream_info.bandwidth or 0) if pl.stream_info else 0,
+    )
+    return best.absolute_uri
+
+
+async def _load_media_playlist(url: str) -> m3u8.M3U8:
+    playlist = await _fetch_m3u8(url)
+    if playlist.playlists:
+        playlist = await _fetch_m3u8(_pick_variant(playlist))
+    if not playlist.segments:
+        raise HLSError("Playlist me koi segment nahi mila.")
+    return playlist
+
+
+def _parse_byterange(value: Optional[str], next_offset: int) -> Tuple[int, int]:
+    """EXT-X-BYTERANGE "len[@offset]" -> (start, end) inclusive."""
+    length, _, offset = value.partition("@")
+    start = int(offset) if offset else next_offset
+    return start, start + int(length) - 1
+
+
+class _Segment:
+    __slots__ = ("index", "uri", "byterange", "init_uri", "init_byterange", "key_uri", "iv")
+
+    def __init__(self, index, uri, byterange, init_uri, init_byterange, key_uri=None, iv=None):
+        self.index = index
+        self.uri = uri
+        self.byterange = byterange
+        self.init_uri = init_uri
+        self.init_byterange = init_byterange
+        self.key_uri = key_uri  # AES-128 key URL (None = plain segment)
+        self.iv = iv
+
+
+def _is_supported_key(key) -> bool:
+    return key is None or key.method in (None, "NONE", "AES-128")
+
+
+def _segment_iv(key, media_sequence: int) -> bytes:
+    """IV attribute ho to wahi, warna media sequence number (16-byte big endian)."""
+    if key.iv:
+        value = key.iv[2:] if key.iv.lower().startswith("0x") else key.iv
+        return bytes.fromhex(value.rjust(32, "0"))
+    return media_sequence.to_bytes(16, "big")
+
+
+def _build_segments(playlist: m3u8.M3U8) -> List[_Segment]:
+    out: List[_Segment] = []
+    next_offset: Dict[str, int] = {}
+    last_init = None
+    first_seq = playlist.media_sequence or 0
+
+    for i, seg in enumerate(playlist.segments):
+        uri = seg.absolute_uri
+        rng = None
+        if seg.byterange:
+            rng = _parse_byterange(seg.byterange, next_offset.get(uri, 0))
+            next_offset[uri] = rng[1] + 1
+
+        # fMP4: EXT-X-MAP init section sirf badalne par dobara likhna hai
+        init_uri = init_rng = None
+        init = getattr(seg, "init_section", None)
+        if init is not None and init.absolute_uri:
+            ident = (init.absolute_uri, init.byterange)
+            if ident != last_init:
+                last_init = ident
+                init_uri = init.absolute_uri
+                if init.byterange:
+                    init_rng = _parse_byterange(init.byterange, 0)
+
+        key_uri = iv = None
+        key = seg.key
+        if key is not None and key.method == "AES-128":
+            key_uri = key.absolute_uri
+            iv = _segment_iv(key, first_seq + i)
+
+        out.append(_Segment(i, uri, rng, init_uri, init_rng, key_uri, iv))
+    return out
+
+
+async def _fetch_bytes(url: str, byterange: Optional[Tuple[int, int]] = None) -> bytes:
+    headers = {}
+    if byterange:
+        headers["Range"] = f"bytes={byterange[0]}-{byterange[1]}"
+    async with get_session().get(url, headers=headers) as resp:
+        resp.raise_for_status()
+        return await resp.read()
+
+
+class _KeyCache:
     """
-    Download m3u8 stream using ffmpeg; container as mp4.
+    Per-playlist AES key cache: har key URI sirf ek baar fetch hoti hai,
+    chahe 2000 segments usi key se encrypted ho (parallel workers ek hi
+    fetch pe wait karte hain).
     """
+
+    def __init__(self):
+        self._keys: Dict[str, asyncio.Future] = {}
+
+    async def get(self, uri: str) -> bytes:
+        fut = self._keys.get(uri)
+        if fut is None:
+            fut = asyncio.ensure_future(self._load(uri))
+            self._keys[uri] = fut
+        try:
+            return await asyncio.shield(fut)
+        except Exception:
+            # fail hua to cache se hatao, agla retry dobara try kare
+            if self._keys.get(uri) is fut:
+                self._keys.pop(uri, None)
+            raise
+
+    async def _load(self, uri: str) -> bytes:
+        key = await _fetch_bytes(uri)
+        if len(key) != 16:
+            raise HLSError(f"Invalid AES-128 key length: {len(key)}")
+        return key
+
+
+def _decrypt_aes128(key: bytes, iv: bytes, data: bytes) -> bytes:
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    plain = cipher.decrypt(data[: len(data) - len(data) % 16])
+    try:
+        return unpad(plain, 16)
+    except ValueError:
+        # kuch servers padding galat bhejte hain, raw hi rakh lo
+        return plain
+
+
+async def _fetch_segment(seg: _Segment, keys: Optional[_KeyCache] = None) -> bytes:
+    """Segment (+ init section agar naya ho) retry/backoff ke saath, encrypted ho to decrypt."""
+    for attempt in range(Config.HLS_SEGMENT_RETRIES + 1):
+        try:
+            data = await _fetch_bytes(seg.uri, seg.byterange)
+            init = b""
+            if seg.init_uri:
+                init = await _fetch_bytes(seg.init_uri, seg.init_byterange)
+            if seg.key_uri:
+                key = await (keys or _KeyCache()).get(seg.key_uri)
+                # AES CPU kaam thread me, event loop free rahe
+                data = await asyncio.to_thread(_decrypt_aes128, key, seg.iv, data)
+                if init:
+                    # AES-128 ke neeche EXT-X-MAP bhi encrypted hota hai (spec:
+                    # tab key ka IV attribute required, wahi seg.iv me hai)
+                    init = await asyncio.to_thread(_decrypt_aes128, key, seg.iv, init)
+            return init + data
+        except SEGMENT_ERRORS:
+            if attempt >= Config.HLS_SEGMENT_RETRIES:
+                raise
+            await asyncio.sleep(min(2 ** attempt, 30))
+    raise HLSError(f"Segment {seg.index} download fail.")
+
+
+async def _download_segments(
+    segments: List[_Segment],
+    out_path: str,
+    progress: Optional[AsyncProgress],
+    cancel_check: Optional[Callable[[], bool]],
+    workers: int,
+    keys: Optional[_KeyCache] = None,
+):
+    """
+    Segments N workers me parallel, par ek bounded window ke andar
+    (next_write + window se aage koi nahi jata), taaki RAM me bas
+    kuch hi segments rahein. Writer unhe order me file me likhta hai.
+    """
+    total = len(segments)
+    window = max(workers * 2, 4)
+    results: Dict[int, bytes] = {}
+    cond = asyncio.Condition()
+    next_fetch = 0
+    next_write = 0
+    written = 0
+
+    async def worker():
+        nonlocal next_fetch
+        while True:
+            async with cond:
+                await cond.wait_for(lambda: next_fetch >= total or next_fetch < next_write + window)
+                if next_fetch >= total:
+                    return
+                idx = next_fetch
+                next_fetch += 1
+            if cancel_check and cancel_check():
+                raise HLSError("Download cancelled by user.")
+            data = await _fetch_segment(segments[idx], keys)
+            async with cond:
+                results[idx] = data
+                cond.notify_all()
+
+    async def writer():
+        nonlocal next_write, written
+        with open(out_path, "wb") as f:
+            while next_write < total:
+                async with cond:
+                    await cond.wait_for(lambda: next_write in results)
+                    data = results.pop(next_write)
+                f.write(data)
+                written += len(data)
+                async with cond:
+                    next_write += 1
+                    cond.notify_all()
+                if progress:
+                    # bytes ka total pata nahi, avg segment size se estimate
+                    est_total = written if next_write == total else int(written / next_write * total)
+                    try:
+                        await progress(written, est_total)
+                    except Exception:
+                        pass
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max(1, workers))]
+    tasks.append(asyncio.create_task(writer()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+
+async def _ffmpeg_fetch(
+    src_url: str,
+    dest_path: str,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    progress: Optional[AsyncProgress] = None,
+):
     cmd = [
         "ffmpeg",
         "-y",
@@ -66,4 +396,54 @@ async def download_m3u8_stream(src_url: str, dest_path: str):
         "copy",
         dest_path,
     ]
-    await run_ffmpeg(cmd)
+    await run_ffmpeg(cmd, priority=PRIO_LONG, cancel_check=cancel_check, progress=progress)
+
+
+async def download_m3u8_stream(
+    src_url: str,
+    dest_path: str,
+    progress: Optional[AsyncProgress] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    workers: Optional[int] = None,
+):
+    """
+    Native HLS download: media playlist parse karke segments parallel
+    (bounded window, per-segment retry) fetch, order me ek file me likh kar
+    ffmpeg se sirf local remux -> mp4.
+    progress(done_bytes, est_total_bytes) har segment ke baad await hota hai.
+    AES-128 streams bhi yahi decrypt hote hain (key cache + thread);
+    SAMPLE-AES jaise baaki methods ffmpeg ko de diye jate hain.
+    """
+    playlist = await _load_media_playlist(src_url)
+    if not all(_is_supported_key(k) for k in playlist.keys):
+        await _ffmpeg_fetch(src_url, dest_path, cancel_check, progress)
+        return
+
+    segments = _build_segments(playlist)
+    raw_path = dest_path + ".hls"
+    try:
+        await _download_segments(
+            segments,
+            raw_path,
+            progress,
+            cancel_check,
+            workers or Config.HLS_WORKERS,
+            _KeyCache(),
+        )
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i",
+            raw_path,
+            "-c",
+            "copy",
+            "-movflags",
+            "+faststart",
+            dest_path,
+        ]
+        await run_ffmpeg(cmd, priority=PRIO_LONG, cancel_check=cancel_check)
+    finally:
+        try:
+            os.remove(raw_path)
+        except OSError:
+            pass
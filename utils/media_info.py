@@ -0,0 +1,217 @@
+# utils/media_info.py
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import Config
+from utils.media_tools import generate_thumbnail, run_ffprobe
+
+# fingerprint ke liye file ke shuru + end se itne bytes
+_FP_CHUNK = 64 * 1024
+
+THUMB_DIR = os.path.join(Config.TEMP_DIR, "_thumbs")
+_thumb_dir_ready = False
+
+
+class MediaInfo:
+    __slots__ = ("duration", "width", "height", "vcodec", "acodec")
+
+    def __init__(self, duration=0, width=0, height=0, vcodec=None, acodec=None):
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.vcodec = vcodec
+        self.acodec = acodec
+
+
+class _LRU:
+    def __init__(self, max_entries: int, on_evict=None):
+        self.max_entries = max(1, max_entries)
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            _, old = self._data.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(old)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _drop_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_meta_cache = _LRU(Config.MEDIA_CACHE_SIZE)
+_thumb_cache = _LRU(Config.MEDIA_CACHE_SIZE, on_evict=_drop_file)
+stats: Dict[str, int] = {"hits": 0, "misses": 0, "thumb_hits": 0, "thumb_misses": 0}
+
+# same key ka kaam already chal raha ho (prewarm + upload) to usi ka wait
+_inflight: Dict[Any, asyncio.Future] = {}
+
+
+async def _once(key, factory):
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(factory())
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _f: _inflight.pop(key, None))
+    # shield: ek waiter cancel ho to baaki ke liye kaam chalta rahe
+    return await asyncio.shield(fut)
+
+
+def _fingerprint_sync(path: str) -> str:
+    size = os.path.getsize(path)
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        h.update(f.read(_FP_CHUNK))
+        if size > _FP_CHUNK:
+            f.seek(max(size - _FP_CHUNK, _FP_CHUNK))
+            h.update(f.read(_FP_CHUNK))
+    return f"{size}-{h.hexdigest()[:20]}"
+
+
+async def fingerprint(path: str) -> str:
+    """Cheap content key: size + head/tail hash (poori file hash nahi karte)."""
+    return await asyncio.to_thread(_fingerprint_sync, path)
+
+
+async def _ffprobe(path: str) -> MediaInfo:
+    out = await run_ffprobe(
+        [
+            "-v", "error",
+            "-show_entries", "format=duration:stream=codec_type,codec_name,width,height",
+            "-of", "json",
+            path,
+        ]
+    )
+    data = json.loads(out.decode(errors="ignore") or "{}")
+
+    info = MediaInfo()
+    try:
+        info.duration = int(float(data.get("format", {}).get("duration") or 0))
+    except ValueError:
+        pass
+    for st in data.get("streams", []):
+        if st.get("codec_type") == "video" and not info.vcodec:
+            info.vcodec = st.get("codec_name")
+            info.width = int(st.get("width") or 0)
+            info.height = int(st.get("height") or 0)
+        elif st.get("codec_type") == "audio" and not info.acodec:
+            info.acodec = st.get("codec_name")
+    return info
+
+
+async def get_media_info(path: str, fp: Optional[str] = None) -> MediaInfo:
+    """Ek ffprobe pass per unique file; same content dobara aaye to cache se."""
+    fp = fp or await fingerprint(path)
+    info = _meta_cache.get(fp)
+    if info is not None:
+        stats["hits"] += 1
+        return info
+
+    async def _load() -> MediaInfo:
+        stats["misses"] += 1
+        try:
+            result = await _ffprobe(path)
+        except (OSError, ValueError):
+            result = MediaInfo()
+        _meta_cache.put(fp, result)
+        return result
+
+    return await _once(("meta", fp), _load)
+
+
+def _ensure_thumb_dir():
+    # pichle run ke bache thumbnails LRU me nahi hain, to shuru me saaf
+    global _thumb_dir_ready
+    if not _thumb_dir_ready:
+        shutil.rmtree(THUMB_DIR, ignore_errors=True)
+        os.makedirs(THUMB_DIR, exist_ok=True)
+        _thumb_dir_ready = True
+
+
+async def get_thumbnail(
+    path: str,
+    time_pos: str,
+    fp: Optional[str] = None,
+    info: Optional[MediaInfo] = None,
+) -> Optional[str]:
+    """Cached thumbnail path (fingerprint + time_pos); pehli baar hi ffmpeg."""
+    fp = fp or await fingerprint(path)
+    key = (fp, time_pos)
+    cached = _thumb_cache.get(key)
+    if cached and os.path.exists(cached):
+        stats["thumb_hits"] += 1
+        return cached
+
+    async def _make() -> Optional[str]:
+        stats["thumb_misses"] += 1
+        _ensure_thumb_dir()
+        # chhoti video me 2 sec ka frame nahi hota
+        pos = time_pos
+        if info is not None and 0 < info.duration <= 2:
+            pos = "00:00:00.200"
+        thumb_path = os.path.join(THUMB_DIR, f"{fp}_{time_pos.replace(':', '')}.jpg")
+        try:
+            await generate_thumbnail(path, thumb_path, time_pos=pos)
+        except Exception:
+            return None
+        if not os.path.exists(thumb_path):
+            return None
+        _thumb_cache.put(key, thumb_path)
+        return thumb_path
+
+    return await _once(("thumb",) + key, _make)
+
+
+async def video_upload_kwargs(path: str, time_pos: str) -> Dict[str, Any]:
+    """
+    send_video ke extra args: duration / width / height + thumb,
+    taaki Telegram ko khud probe na karna pade.
+    """
+    fp = await fingerprint(path)
+    info = await get_media_info(path, fp)
+    kwargs: Dict[str, Any] = {
+        "thumb": await get_thumbnail(path, time_pos, fp, info),
+        "supports_streaming": True,
+    }
+    if info.duration:
+        kwargs["duration"] = info.duration
+    if info.width and info.height:
+        kwargs["width"] = info.width
+        kwargs["height"] = info.height
+    return kwargs
+
+
+async def prewarm_video(path: str, time_pos: str):
+    """
+    Upload se pehle background me metadata + thumbnail bana do (thumbnail
+    lane, low priority). Baad me video_upload_kwargs cache / in-flight
+    job se turant mil jata hai.
+    """
+    try:
+        await video_upload_kwargs(path, time_pos)
+    except Exception:
+        pass
+
+
+def media_cache_stats() -> Dict[str, int]:
+    return dict(stats, entries=len(_meta_cache), thumbs=len(_thumb_cache))
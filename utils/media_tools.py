@@ -1,25 +1,301 @@
 # utils/media_tools.py
 import asyncio
+import heapq
+import itertools
 import os
-from typing import List
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import psutil
+
+from config import Config
+
+# priority lanes: chhota number pehle (ffprobe ms ka kaam, thumbnail 1 sec ka,
+# remux minutes ka)
+PRIO_PROBE = 0
+PRIO_THUMB = 1
+PRIO_NORMAL = 2
+PRIO_LONG = 3
+
+# progress(done, total) -> awaitable
+AsyncProgress = Callable[[int, int], Awaitable[Any]]
 
 
 class FFmpegError(RuntimeError):
     pass
 
 
-async def run_ffmpeg(cmd: list):
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+class FFmpegCancelled(FFmpegError):
+    pass
+
+
+class FFmpegStalled(FFmpegError):
+    pass
+
+
+class _FFmpegPool:
+    """
+    Global ffmpeg limiter: ek time pe max N processes, baaki priority
+    lane + FIFO order me wait karte hain. CPU / wall time ka hisaab bhi.
+    """
+
+    def __init__(self, max_procs: int):
+        self.max_procs = max(1, max_procs)
+        self.running = 0
+        self._waiters: list = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.stats: Dict[str, float] = {
+            "jobs": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "cpu_sec": 0.0,
+            "wall_sec": 0.0,
+        }
+
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: int):
+        if self.running < self.max_procs and not self.queued():
+            self.running += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # slot mil chuka tha, aage pass karo
+                self.release()
+            else:
+                fut.cancel()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                # slot seedha next waiter ko (running count same)
+                fut.set_result(True)
+                return
+        self.running = max(0, self.running - 1)
+
+    def account(self, wall: float, cpu: float, status: str):
+        self.stats["jobs"] += 1
+        self.stats["wall_sec"] += wall
+        self.stats["cpu_sec"] += cpu
+        if status in ("failed", "cancelled"):
+            self.stats[status] += 1
+
+
+ffmpeg_pool = _FFmpegPool(Config.FFMPEG_MAX_PROCS)
+
+
+def ffmpeg_stats() -> Dict[str, float]:
+    return dict(
+        ffmpeg_pool.stats,
+        running=ffmpeg_pool.running,
+        queued=ffmpeg_pool.queued(),
     )
-    out, err = await proc.communicate()
-    if proc.returncode != 0:
-        raise FFmpegError(err.decode(errors="ignore"))
 
 
-async def extract_audio(video_path: str, output_path: str):
+def _cpu_seconds(ps: Optional[psutil.Process], last: float) -> float:
+    # process exit ho gaya to last sample hi rakho
+    if ps is None:
+        return last
+    try:
+        t = ps.cpu_times()
+        return t.user + t.system
+    except psutil.Error:
+        return last
+
+
+def _kill(proc: asyncio.subprocess.Process):
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+def _input_path(cmd: list) -> Optional[str]:
+    # pehla "-i" input (duration probe ke liye)
+    try:
+        return cmd[cmd.index("-i") + 1]
+    except (ValueError, IndexError):
+        return None
+
+
+async def run_ffprobe(args: list) -> bytes:
+    """
+    ffprobe bhi global pool ke through (probe lane, sabse pehle), taaki
+    process cap me gine; stdout return.
+    """
+    await ffmpeg_pool.acquire(PRIO_PROBE)
+    start = time.time()
+    status = "failed"
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffprobe",
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            out, _ = await proc.communicate()
+        except BaseException:
+            _kill(proc)
+            status = "cancelled"
+            raise
+        status = "ok"
+        return out
+    finally:
+        ffmpeg_pool.account(time.time() - start, 0.0, status)
+        ffmpeg_pool.release()
+
+
+async def probe_duration(path: str) -> float:
+    """ffprobe se duration (seconds); pata na chale to 0."""
+    try:
+        out = await run_ffprobe(
+            [
+                "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=nw=1:nk=1",
+                path,
+            ]
+        )
+        return max(0.0, float(out.decode().strip() or 0))
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _parse_progress_line(line: bytes, state: Dict[str, float]):
+    """-progress pipe:1 ke key=value lines -> state (out_time sec, size, speed, blocks)."""
+    key, sep, value = line.decode(errors="ignore").strip().partition("=")
+    if not sep or value in ("", "N/A"):
+        return
+    try:
+        if key in ("out_time_us", "out_time_ms"):
+            # dono microseconds hi hote hain (ffmpeg ka purana naming bug)
+            state["out_time"] = int(value) / 1_000_000
+        elif key == "total_size":
+            state["size"] = int(value)
+        elif key == "speed":
+            state["speed"] = float(value.rstrip("x"))
+        elif key == "progress":
+            # har block "progress=continue/end" pe khatam hota hai
+            state["blocks"] += 1
+    except ValueError:
+        pass
+
+
+async def run_ffmpeg(
+    cmd: list,
+    priority: int = PRIO_NORMAL,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    progress: Optional[AsyncProgress] = None,
+    duration: Optional[float] = None,
+    poll_interval: float = 0.5,
+) -> Dict[str, float]:
+    """
+    ffmpeg ko global pool ke through chalata hai, -progress pipe:1 ke saath.
+    progress(done_bytes, est_total_bytes) live await hota hai; total
+    ffprobe duration se estimate (out_time / duration).
+    cancel_check() True ho (ya task cancel ho) to child process kill.
+    FFMPEG_STALL_SEC tak koi progress na ho to bhi kill (FFmpegStalled);
+    pehla progress block aane tak (input probe / analyze) FFMPEG_STARTUP_SEC.
+    Returns {"wall_sec", "cpu_sec"} is job ke liye.
+    """
+    cmd = [cmd[0], "-nostats", "-progress", "pipe:1", *cmd[1:]]
+    if progress and duration is None:
+        src = _input_path(cmd)
+        duration = await probe_duration(src) if src else 0.0
+
+    await ffmpeg_pool.acquire(priority)
+    start = time.time()
+    cpu = 0.0
+    status = "failed"
+    state: Dict[str, float] = {"out_time": 0.0, "size": 0, "speed": 0.0, "blocks": 0}
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            ps = psutil.Process(proc.pid)
+        except psutil.Error:
+            ps = None
+        err_task = asyncio.create_task(proc.stderr.read())
+
+        async def _read_progress():
+            async for line in proc.stdout:
+                _parse_progress_line(line, state)
+
+        out_task = asyncio.create_task(_read_progress())
+        last_mark = (0.0, 0)
+        last_change = time.time()
+        last_sent = -1
+
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=poll_interval)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                cpu = _cpu_seconds(ps, cpu)
+                if cancel_check and cancel_check():
+                    raise FFmpegCancelled("ffmpeg job cancelled.")
+
+                now = time.time()
+                mark = (state["out_time"], state["size"])
+                limit = Config.FFMPEG_STALL_SEC if state["blocks"] else Config.FFMPEG_STARTUP_SEC
+                if mark != last_mark:
+                    last_mark, last_change = mark, now
+                elif now - last_change > limit:
+                    raise FFmpegStalled(
+                        f"ffmpeg {int(now - last_change)}s se atka hua tha, kill kar diya."
+                    )
+
+                if progress and duration and state["out_time"] > 0 and state["size"] != last_sent:
+                    last_sent = state["size"]
+                    frac = min(state["out_time"] / duration, 0.999)
+                    try:
+                        await progress(state["size"], int(state["size"] / frac))
+                    except Exception:
+                        pass
+        except BaseException as e:
+            _kill(proc)
+            await proc.wait()
+            err_task.cancel()
+            out_task.cancel()
+            status = "failed" if isinstance(e, FFmpegStalled) else "cancelled"
+            raise
+
+        err = await err_task
+        await out_task
+        if proc.returncode != 0:
+            raise FFmpegError(err.decode(errors="ignore")[-2000:])
+        status = "ok"
+        if progress and state["size"]:
+            try:
+                await progress(state["size"], state["size"])
+            except Exception:
+                pass
+    finally:
+        wall = time.time() - start
+        ffmpeg_pool.account(wall, cpu, status)
+        ffmpeg_pool.release()
+    return {"wall_sec": wall, "cpu_sec": cpu}
+
+
+async def extract_audio(
+    video_path: str,
+    output_path: str,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    progress: Optional[AsyncProgress] = None,
+):
     # ffmpeg -i input -vn -acodec copy output
     cmd = [
         "ffmpeg", "-y",
@@ -28,7 +304,7 @@ async def extract_audio(video_path: str, output_path: str):
         "-acodec", "copy",
         output_path
     ]
-    await run_ffmpeg(cmd)
+    await run_ffmpeg(cmd, priority=PRIO_LONG, cancel_check=cancel_check, progress=progress)
 
 
 async def merge_videos(video_paths: List[str], output_path: str):
@@ -45,7 +321,7 @@ async def merge_videos(video_paths: List[str], output_path: str):
         "-c", "copy",
         output_path
     ]
-    await run_ffmpeg(cmd)
+    await run_ffmpeg(cmd, priority=PRIO_LONG)
     try:
         os.remove(list_file)
     except OSError:
@@ -62,7 +338,38 @@ async def split_video(video_path: str, start: str, duration: str, output_path: s
         "-c", "copy",
         output_path
     ]
-    await run_ffmpeg(cmd)
+    await run_ffmpeg(cmd, priority=PRIO_LONG)
+
+
+async def split_video_segments(
+    video_path: str,
+    segment_sec: float,
+    output_pattern: str,
+    cancel_check: Optional[Callable[[], bool]] = None,
+):
+    """
+    Stream copy se equal-duration parts (segment muxer, cut sirf keyframes pe).
+    output_pattern me %03d hona chahiye, numbering 1 se.
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", video_path,
+        "-map", "0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", f"{segment_sec:.3f}",
+        "-segment_start_number", "1",
+        "-reset_timestamps", "1",
+        output_pattern,
+    ]
+    await run_ffmpeg(cmd, priority=PRIO_LONG, cancel_check=cancel_check)
+
+
+def _has_frame(path: str) -> bool:
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
 
 
 async def generate_thumbnail(
@@ -73,15 +380,41 @@ async def generate_thumbnail(
     """
     Thumbnail generate karega video se:
     ffmpeg -ss time_pos -i video -vframes 1 -q:v 2 thumb.jpg
+    Input seek pichhle keyframe tak jump karta hai aur wahan se exact
+    time_pos tak decode (accurate frame, phir bhi fast).
+    Frame na nikle (clip time_pos se chhoti) to fallback: shuru ka pehla
+    keyframe, -skip_frame nokey (sirf keyframes decode).
     """
     cmd = [
         "ffmpeg",
         "-y",
         "-ss", time_pos,
         "-i", video_path,
+        "-an", "-sn",
+        "-vframes", "1",
+        "-q:v", "2",
+        thumb_path,
+    ]
+    try:
+        await run_ffmpeg(cmd, priority=PRIO_THUMB)
+    except FFmpegCancelled:
+        raise
+    except FFmpegError:
+        pass
+    if _has_frame(thumb_path):
+        return thumb_path
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-skip_frame", "nokey",
+        "-i", video_path,
+        "-an", "-sn",
         "-vframes", "1",
         "-q:v", "2",
         thumb_path,
     ]
-    await run_ffmpeg(cmd)
+    await run_ffmpeg(cmd, priority=PRIO_THUMB)
+    if not _has_frame(thumb_path):
+        raise FFmpegError("Thumbnail frame nahi nikla.")
     return thumb_path
@@ -1,12 +1,20 @@
 # utils/progress.py
+import math
 import time
-from typing import Dict
+from collections import deque
+from typing import Any, Dict, List, Optional
 
 from pyrogram.types import Message
 
-from config import Config
+from utils.edit_dispatcher import edit_dispatcher
 
-_last_update: Dict[int, float] = {}  # msg_id -> timestamp
+# EWMA speed ka time constant (sec) aur ETA ka sliding window
+SPEED_TAU = 5.0
+ETA_WINDOW = 20.0
+MIN_SAMPLE_SEC = 0.5
+# itni der update na aaye to tracker dead (fail / cancel), registry se hatao
+TRACKER_TTL = 300
+SWEEP_EVERY = 30
 
 
 def human_bytes(size: int) -> str:
@@ -34,6 +42,171 @@ def human_time(seconds: int) -> str:
     return f"{s}s"
 
 
+class ProgressTracker:
+    """
+    Ek transfer ka progress state.
+    speed = EWMA (stall ke baad jaldi adjust hoti hai, total average nahi),
+    ETA = last ETA_WINDOW sec ke bytes se.
+    """
+
+    __slots__ = (
+        "key",
+        "file_name",
+        "direction",
+        "start_time",
+        "current",
+        "total",
+        "speed",
+        "updated",
+        "_sample_ts",
+        "_sample_bytes",
+        "_window",
+        "closed",
+    )
+
+    def __init__(self, key: tuple, file_name: str, direction: str, start_time: float):
+        now = time.time()
+        self.key = key
+        self.file_name = file_name
+        self.direction = direction
+        self.start_time = start_time
+        self.current = 0
+        self.total = 0
+        self.speed = 0.0
+        self.updated = now
+        self._sample_ts = start_time
+        self._sample_bytes = 0
+        self._window: deque = deque()
+        self.closed = False
+
+    def update(self, current: int, total: int, now: Optional[float] = None):
+        now = now or time.time()
+        self.current, self.total, self.updated = current, total, now
+
+        dt = now - self._sample_ts
+        if dt >= MIN_SAMPLE_SEC:
+            inst = max(0, current - self._sample_bytes) / dt
+            if self.speed <= 0:
+                self.speed = inst
+            else:
+                alpha = 1 - math.exp(-dt / SPEED_TAU)
+                self.speed += alpha * (inst - self.speed)
+            self._sample_ts, self._sample_bytes = now, current
+
+        self._window.append((now, current))
+        while len(self._window) > 2 and now - self._window[0][0] > ETA_WINDOW:
+            self._window.popleft()
+
+    def eta(self) -> int:
+        left = self.total - self.current
+        if self.total <= 0 or left <= 0:
+            return 0
+        rate = 0.0
+        if len(self._window) >= 2:
+            (t0, b0), (t1, b1) = self._window[0], self._window[-1]
+            if t1 > t0:
+                rate = (b1 - b0) / (t1 - t0)
+        rate = rate if rate > 0 else self.speed
+        return int(left / rate) if rate > 0 else 0
+
+    def percent(self) -> float:
+        return self.current * 100 / self.total if self.total > 0 else 0.0
+
+    def close(self):
+        self.closed = True
+        if _trackers.get(self.key) is self:
+            _trackers.pop(self.key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.file_name,
+            "direction": self.direction,
+            "current": self.current,
+            "total": self.total,
+            "speed": self.speed,
+            "eta": self.eta(),
+            "elapsed": self.updated - self.start_time,
+        }
+
+    def render(self) -> str:
+        percent = self.percent()
+        filled_len = int(20 * percent / 100)
+        bar = "●" * filled_len + "○" * (20 - filled_len)
+
+        return (
+            "➵⋆🪐ᴛᴇᴄʜɴɪᴄᴀʟ_sᴇʀᴇɴᴀ𓂃\n\n"
+            f"{self.file_name}\n"
+            f"{self.direction}\n"
+            f" [{bar}] \n"
+            f"◌Progress😉:〘 {percent:.2f}% 〙\n"
+            f"Done: 〘{human_bytes(self.current)} of {human_bytes(self.total)}〙\n"
+            f"◌Speed🚀:〘 {human_bytes(int(self.speed))}/s 〙\n"
+            f"◌Time Left⏳:〘 {human_time(self.eta())} 〙"
+        )
+
+
+# (chat_id, msg_id) -> tracker; TaskProgress stages (chat_id, msg_id, stage) pe
+_trackers: Dict[tuple, ProgressTracker] = {}
+_last_sweep = 0.0
+
+
+def _sweep(now: float):
+    global _last_sweep
+    if now - _last_sweep < SWEEP_EVERY:
+        return
+    _last_sweep = now
+    for t in [t for t in _trackers.values() if now - t.updated > TRACKER_TTL]:
+        t.close()
+
+
+def get_tracker(
+    message: Message,
+    start_time: float,
+    file_name: str,
+    direction: str,
+) -> ProgressTracker:
+    """Same status message pe naya transfer (start_time alag) -> naya tracker."""
+    key = (message.chat.id, message.id)
+    t = _trackers.get(key)
+    if t is None or t.start_time != start_time:
+        _sweep(time.time())
+        t = ProgressTracker(key, file_name, direction, start_time)
+        _trackers[key] = t
+    else:
+        t.file_name, t.direction = file_name, direction
+    return t
+
+
+def register_tracker(t: ProgressTracker):
+    """Bahar bana tracker (e.g. TaskProgress stage) live transfers me dikhao."""
+    _sweep(time.time())
+    t.closed = False
+    _trackers[t.key] = t
+
+
+def close_progress(message: Message):
+    """Transfer khatam / fail: tracker aur pending edit dono hatao."""
+    t = _trackers.get((message.chat.id, message.id))
+    if t is not None:
+        t.close()
+    edit_dispatcher.discard(message)
+
+
+def live_transfers() -> List[Dict[str, Any]]:
+    """Chal rahe transfers ka snapshot (status / scheduler / metrics ke liye)."""
+    _sweep(time.time())
+    return [t.snapshot() for t in _trackers.values()]
+
+
+def transfer_stats() -> Dict[str, Any]:
+    live = live_transfers()
+    return {
+        "active": len(live),
+        "speed": sum(t["speed"] for t in live),
+        "bytes_left": sum(max(0, t["total"] - t["current"]) for t in live),
+    }
+
+
 async def progress_for_pyrogram(
     current: int,
     total: int,
@@ -45,42 +218,14 @@ async def progress_for_pyrogram(
     """
     Pyrogram progress callback.
     NOTE: start_time = time.time() hona chahiye. (bot.py me fix kiya gaya hai)
+    Sirf tracker update hota hai; edit edit_dispatcher budget ke andar bhejta
+    hai. Transfer complete (current == total) pe tracker close + pending edit
+    drop, caller agla status khud likhta hai.
     """
-    now = time.time()
-    msg_id = message.id
-    last = _last_update.get(msg_id, 0)
-    if now - last < Config.PROGRESS_UPDATE_INTERVAL and current != total:
+    if total > 0 and current >= total:
+        close_progress(message)
         return
 
-    _last_update[msg_id] = now
-
-    if total <= 0:
-        percent = 0.0
-    else:
-        percent = current * 100 / total
-
-    elapsed = max(now - start_time, 1e-3)  # 0 se bachne ke liye
-    speed = current / elapsed  # bytes/sec
-    eta = int((total - current) / speed) if speed > 0 and total > 0 else 0
-
-    filled_len = int(20 * percent / 100)
-    bar = "●" * filled_len + "○" * (20 - filled_len)
-
-    text = (
-        "➵⋆🪐ᴛᴇᴄʜɴɪᴄᴀʟ_sᴇʀᴇɴᴀ𓂃\n\n"
-        f"{file_name}\n"
-        f"{direction}\n"
-        f" [{bar}] \n"
-        f"◌Progress😉:〘 {percent:.2f}% 〙\n"
-        f"Done: 〘{human_bytes(current)} of {human_bytes(total)}〙\n"
-        f"◌Speed🚀:〘 {human_bytes(int(speed))}/s 〙\n"
-        f"◌Time Left⏳:〘 {human_time(eta)} 〙"
-    )
-
-    try:
-        await message.edit_text(text)
-    except Exception:
-        pass
-
-    if current == total and msg_id in _last_update:
-        _last_update.pop(msg_id, None)
+    tracker = get_tracker(message, start_time, file_name, direction)
+    tracker.update(current, total)
+    edit_dispatcher.submit(message, tracker.render)
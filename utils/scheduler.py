@@ -0,0 +1,178 @@
+# utils/scheduler.py
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config import Config
+
+# resource lanes: network download/upload, disk heavy (extract), cpu heavy (ffmpeg)
+RES_NET = "net"
+RES_DISK = "disk"
+RES_CPU = "cpu"
+
+# on_position(pos) -> awaitable; pos 1-based queue position
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class _Waiter:
+    __slots__ = ("user_id", "resources", "premium", "seq", "future", "on_position", "last_pos")
+
+    def __init__(self, user_id, resources, premium, seq, future, on_position):
+        self.user_id = user_id
+        self.resources = resources
+        self.premium = premium
+        self.seq = seq
+        self.future = future
+        self.on_position = on_position
+        self.last_pos = None
+
+
+class Scheduler:
+    """
+    Global admission control for heavy jobs.
+
+    - total + per-resource concurrency limits (net / disk / cpu)
+    - per-user limit (default 1 job at a time, baaki queue me)
+    - premium pehle, phir fair: jis user ke kam jobs chal rahe hain /
+      jise sabse pehle serve kiya gaya tha, wo pehle
+    """
+
+    def __init__(
+        self,
+        max_jobs: int,
+        resource_limits: Dict[str, int],
+        per_user: int,
+    ):
+        self.max_jobs = max(1, max_jobs)
+        self.resource_limits = {k: max(1, v) for k, v in resource_limits.items()}
+        self.per_user = max(1, per_user)
+
+        self.running = 0
+        self.running_res: Dict[str, int] = {k: 0 for k in self.resource_limits}
+        self.running_user: Dict[int, int] = {}
+        self.last_served: Dict[int, float] = {}
+        self.waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    # ---------- internals ----------
+
+    def _fits(self, w: _Waiter) -> bool:
+        if self.running >= self.max_jobs:
+            return False
+        if self.running_user.get(w.user_id, 0) >= self.per_user:
+            return False
+        for r in w.resources:
+            if self.running_res.get(r, 0) >= self.resource_limits.get(r, self.max_jobs):
+                return False
+        return True
+
+    def _key(self, w: _Waiter):
+        return (
+            0 if w.premium else 1,
+            self.running_user.get(w.user_id, 0),
+            self.last_served.get(w.user_id, 0.0),
+            w.seq,
+        )
+
+    def _take(self, w: _Waiter):
+        self.running += 1
+        for r in w.resources:
+            self.running_res[r] = self.running_res.get(r, 0) + 1
+        self.running_user[w.user_id] = self.running_user.get(w.user_id, 0) + 1
+        self.last_served[w.user_id] = time.time()
+
+    def _pump(self):
+        self.waiters = [w for w in self.waiters if not w.future.done()]
+        self.waiters.sort(key=self._key)
+
+        for w in list(self.waiters):
+            if self._fits(w):
+                self._take(w)
+                self.waiters.remove(w)
+                w.future.set_result(True)
+
+        # queue position updates
+        for pos, w in enumerate(self.waiters, start=1):
+            if w.on_position and w.last_pos != pos:
+                w.last_pos = pos
+                asyncio.ensure_future(_safe_notify(w.on_position, pos))
+
+    # ---------- public API ----------
+
+    def queue_length(self) -> int:
+        return len(self.waiters)
+
+    async def acquire(
+        self,
+        user_id: int,
+        resources: Iterable[str],
+        premium: bool = False,
+        on_position: Optional[PositionCallback] = None,
+    ) -> _Waiter:
+        loop = asyncio.get_running_loop()
+        w = _Waiter(
+            user_id,
+            tuple(resources),
+            premium,
+            next(self._seq),
+            loop.create_future(),
+            on_position,
+        )
+        self.waiters.append(w)
+        self._pump()
+        try:
+            await w.future
+        except asyncio.CancelledError:
+            if w.future.done() and not w.future.cancelled():
+                # slot mil chuka tha, wapas do
+                self.release(w)
+            else:
+                w.future.cancel()
+                self._pump()
+            raise
+        return w
+
+    def release(self, w: _Waiter):
+        self.running = max(0, self.running - 1)
+        for r in w.resources:
+            self.running_res[r] = max(0, self.running_res.get(r, 0) - 1)
+        left = self.running_user.get(w.user_id, 0) - 1
+        if left > 0:
+            self.running_user[w.user_id] = left
+        else:
+            self.running_user.pop(w.user_id, None)
+        self._pump()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: int,
+        resources: Iterable[str],
+        premium: bool = False,
+        on_position: Optional[PositionCallback] = None,
+    ):
+        w = await self.acquire(user_id, resources, premium, on_position)
+        try:
+            yield
+        finally:
+            self.release(w)
+
+
+async def _safe_notify(cb: PositionCallback, pos: int):
+    try:
+        await cb(pos)
+    except Exception:
+        pass
+
+
+scheduler = Scheduler(
+    max_jobs=Config.SCHED_MAX_JOBS,
+    resource_limits={
+        RES_NET: Config.SCHED_NET_SLOTS,
+        RES_DISK: Config.SCHED_DISK_SLOTS,
+        RES_CPU: Config.SCHED_CPU_SLOTS,
+    },
+    per_user=Config.SCHED_PER_USER,
+)
@@ -0,0 +1,124 @@
+# utils/splitter.py
+import asyncio
+import math
+import os
+from typing import Callable, List, Optional
+
+from config import Config
+from utils.media_tools import FFmpegCancelled, FFmpegError, probe_duration, split_video_segments
+
+COPY_CHUNK = 1024 * 1024
+# bitrate kabhi barabar nahi hota, isliye target thoda kam rakho
+_VIDEO_FILL = 0.9
+_VIDEO_ATTEMPTS = 3
+
+
+def upload_limit() -> int:
+    return Config.MAX_UPLOAD_MB * 1024 * 1024
+
+
+def needs_split(path: str, max_bytes: Optional[int] = None) -> bool:
+    try:
+        return os.path.getsize(path) > (max_bytes or upload_limit())
+    except OSError:
+        return False
+
+
+def _remove_all(paths: List[str]):
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _segment_outputs(path: str) -> List[str]:
+    folder = os.path.dirname(path) or "."
+    stem, ext = os.path.splitext(os.path.basename(path))
+    prefix = f"{stem}.part"
+    return sorted(
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if f.startswith(prefix) and f.endswith(ext) and f[len(prefix):-len(ext) or None].isdigit()
+    )
+
+
+async def _split_video(
+    path: str,
+    max_bytes: int,
+    cancel_check: Optional[Callable[[], bool]],
+) -> Optional[List[str]]:
+    duration = await probe_duration(path)
+    if duration <= 0:
+        return None
+
+    size = os.path.getsize(path)
+    stem, ext = os.path.splitext(path)
+    parts = math.ceil(size / (max_bytes * _VIDEO_FILL))
+    for _ in range(_VIDEO_ATTEMPTS):
+        await split_video_segments(
+            path, duration / parts, f"{stem}.part%03d{ext}", cancel_check
+        )
+        outputs = _segment_outputs(path)
+        if outputs and all(os.path.getsize(p) <= max_bytes for p in outputs):
+            return outputs
+        # koi part limit se bada (lambe GOP / bitrate spike) -> zyada parts
+        _remove_all(outputs)
+        parts = math.ceil(parts * 1.5)
+    return None
+
+
+def _split_raw(path: str, max_bytes: int) -> List[str]:
+    """name.001, name.002, ... (7-Zip / cat se wapas jod sakte hain)."""
+    outputs: List[str] = []
+    try:
+        with open(path, "rb") as src:
+            idx = 1
+            while True:
+                part = f"{path}.{idx:03d}"
+                written = 0
+                with open(part, "wb") as dst:
+                    while written < max_bytes:
+                        chunk = src.read(min(COPY_CHUNK, max_bytes - written))
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        written += len(chunk)
+                if not written:
+                    os.remove(part)
+                    break
+                outputs.append(part)
+                idx += 1
+    except BaseException:
+        _remove_all(outputs)
+        raise
+    return outputs
+
+
+async def split_for_upload(
+    path: str,
+    video: bool = False,
+    max_bytes: Optional[int] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+) -> List[str]:
+    """
+    Telegram limit (MAX_UPLOAD_MB) se badi file ke parts banata hai.
+    Video: keyframe aligned stream-copy parts (har part playable),
+    warna / fail ho to raw byte chunks. Chhoti file -> [path] as it is.
+    Parts upload hone ke baad caller delete kare.
+    """
+    max_bytes = max_bytes or upload_limit()
+    if not needs_split(path, max_bytes):
+        return [path]
+
+    if video:
+        try:
+            parts = await _split_video(path, max_bytes, cancel_check)
+            if parts:
+                return parts
+        except FFmpegCancelled:
+            raise
+        except FFmpegError:
+            _remove_all(_segment_outputs(path))
+
+    return await asyncio.to_thread(_split_raw, path, max_bytes)
@@ -0,0 +1,156 @@
+# utils/task_progress.py
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram.errors import MessageNotModified
+from pyrogram.types import Message
+
+from utils.edit_dispatcher import edit_dispatcher
+from utils.progress import ProgressTracker, human_bytes, human_time, register_tracker
+
+# overall progress ko itne units me track karte hain (ETA ke liye)
+UNITS = 10000
+
+
+class _Stage:
+    __slots__ = ("name", "weight", "current", "total", "detail", "done", "tracker")
+
+    def __init__(self, name: str, weight: float, key: Tuple[int, int], start: float):
+        self.name = name
+        self.weight = max(0.0, float(weight))
+        self.current = 0
+        self.total = 0
+        self.detail = ""
+        self.done = False
+        # (chat_id, msg_id, stage): /status aur transfer_stats() me alag dikhe
+        self.tracker = ProgressTracker(key + (name,), name, name.lower(), start)
+        self.tracker.closed = True  # pehle update pe register hota hai
+
+    def fraction(self) -> float:
+        if self.done:
+            return 1.0
+        if self.total <= 0:
+            return 0.0
+        return min(1.0, self.current / self.total)
+
+
+class TaskProgress:
+    """
+    Ek task = ek live status message.
+
+    Stages weighted hote hain (download / extract / upload ...), overall % =
+    sum(weight * stage fraction) / sum(weight). Stages saath me bhi chal
+    sakte hain (extract + upload pipeline). Edits edit_dispatcher se jate
+    hain, to per-chat / per-bot budget yahan bhi lagta hai.
+    """
+
+    __slots__ = ("message", "title", "stages", "note_text", "closed", "_overall")
+
+    def __init__(self, message: Message, title: str, stages: List[Tuple[str, float]]):
+        start = time.time()
+        key = (message.chat.id, message.id)
+        self.message = message
+        self.title = title
+        self.stages: Dict[str, _Stage] = {
+            name: _Stage(name, weight, key, start) for name, weight in stages
+        }
+        self.note_text = ""
+        self.closed = False
+        self._overall = ProgressTracker(key, title, "", start)
+
+    # ---------- state ----------
+
+    def overall(self) -> float:
+        weight = sum(st.weight for st in self.stages.values())
+        if weight <= 0:
+            return 0.0
+        return sum(st.weight * st.fraction() for st in self.stages.values()) / weight
+
+    def update(self, name: str, current: int, total: int, detail: Optional[str] = None):
+        st = self.stages.get(name)
+        if st is None or self.closed:
+            return
+        st.current, st.total = current, total
+        if detail is not None:
+            st.detail = detail
+        if st.tracker.closed and not st.done:
+            register_tracker(st.tracker)
+        st.tracker.update(current, total)
+        self._overall.update(int(self.overall() * UNITS), UNITS)
+        self._submit()
+
+    def callback(self, name: str):
+        """progress_for_pyrogram jaisa callback (current, total, *args)."""
+
+        async def _progress(current: int, total: int, *_args):
+            self.update(name, current, total)
+
+        return _progress
+
+    def complete(self, name: str):
+        st = self.stages.get(name)
+        if st is None or st.done:
+            return
+        st.done = True
+        st.current = max(st.current, st.total)
+        st.tracker.close()
+        self._overall.update(int(self.overall() * UNITS), UNITS)
+        self._submit()
+
+    async def note(self, text: str):
+        """Chhota status line (e.g. "scan ho rahi hai"), naya message nahi."""
+        self.note_text = text
+        self._submit()
+
+    def start(self):
+        self._submit()
+
+    # ---------- output ----------
+
+    def _submit(self):
+        if not self.closed:
+            edit_dispatcher.submit(self.message, self.render)
+
+    def render(self) -> str:
+        percent = self.overall() * 100
+        filled_len = int(20 * percent / 100)
+        bar = "●" * filled_len + "○" * (20 - filled_len)
+
+        lines = [
+            "➵⋆🪐ᴛᴇᴄʜɴɪᴄᴀʟ_sᴇʀᴇɴᴀ𓂃\n",
+            f"{self.title}",
+            f" [{bar}] ",
+            f"◌Progress😉:〘 {percent:.2f}% 〙",
+            f"◌Time Left⏳:〘 {human_time(self._overall.eta())} 〙\n",
+        ]
+        for st in self.stages.values():
+            if st.done:
+                lines.append(f"✅ {st.name}")
+            elif st.current > 0:
+                line = f"▶️ {st.name}: {st.fraction() * 100:.1f}%"
+                if st.total > 0:
+                    line += f" · {human_bytes(st.current)} of {human_bytes(st.total)}"
+                line += f" · {human_bytes(int(st.tracker.speed))}/s"
+                if st.detail:
+                    line += f" · {st.detail}"
+                lines.append(line)
+            else:
+                lines.append(f"⏳ {st.name}")
+        if self.note_text:
+            lines.append(f"\n{self.note_text}")
+        return "\n".join(lines)
+
+    def close(self):
+        self.closed = True
+        for st in self.stages.values():
+            st.tracker.close()
+        edit_dispatcher.discard(self.message)
+
+    async def finish(self, text: str, **kwargs):
+        """Pending progress edit hata ke final text (error / result / menu)."""
+        self.close()
+        await edit_dispatcher.settle(self.message)
+        try:
+            await self.message.edit_text(text, **kwargs)
+        except MessageNotModified:
+            pass
@@ -0,0 +1,251 @@
+# utils/tg_downloader.py
+import asyncio
+import math
+import os
+from typing import Callable, Optional
+
+from pyrogram import Client, raw
+from pyrogram.errors import AuthBytesInvalid
+from pyrogram.file_id import FileId, FileType
+from pyrogram.session import Session
+from pyrogram.session.auth import Auth
+
+from config import Config
+
+# pyrogram GetFile hamesha 1 MB chunks deta hai
+CHUNK = 1024 * 1024
+RANGE_RETRIES = 3
+
+
+class _ShortRead(Exception):
+    pass
+
+
+class _NotDirect(Exception):
+    """CDN redirect / unsupported location -> normal download_media."""
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+def _location(media):
+    fid = FileId.decode(media.file_id)
+    if fid.file_type == FileType.CHAT_PHOTO:
+        raise _NotDirect("chat photo")
+    if fid.file_type == FileType.PHOTO:
+        loc = raw.types.InputPhotoFileLocation(
+            id=fid.media_id,
+            access_hash=fid.access_hash,
+            file_reference=fid.file_reference,
+            thumb_size=fid.thumbnail_size,
+        )
+    else:
+        loc = raw.types.InputDocumentFileLocation(
+            id=fid.media_id,
+            access_hash=fid.access_hash,
+            file_reference=fid.file_reference,
+            thumb_size=fid.thumbnail_size,
+        )
+    return fid.dc_id, loc
+
+
+async def _media_session(client: Client, dc_id: int) -> Session:
+    """
+    Har DC ka ek media session, saari ranges / retries / downloads share
+    karte hain (stream_media har call pe naya session + auth export karta
+    tha). client.media_sessions me rakha hai, to client.stop() pe band.
+    """
+    key = ("download", dc_id)
+    async with client.media_sessions_lock:
+        session = client.media_sessions.get(key)
+        if session is not None:
+            return session
+
+        test_mode = await client.storage.test_mode()
+        home = dc_id == await client.storage.dc_id()
+        auth_key = (
+            await client.storage.auth_key()
+            if home
+            else await Auth(client, dc_id, test_mode).create()
+        )
+        session = Session(client, dc_id, auth_key, test_mode, is_media=True)
+        await session.start()
+
+        if not home:
+            for _ in range(3):
+                exported = await client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc_id))
+                try:
+                    await session.invoke(
+                        raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes)
+                    )
+                except AuthBytesInvalid:
+                    continue
+                break
+            else:
+                await session.stop()
+                raise AuthBytesInvalid
+
+        client.media_sessions[key] = session
+        return session
+
+
+async def _fetch_range(
+    session: Session,
+    location,
+    path: str,
+    first_chunk: int,
+    chunk_count: int,
+    expected: int,
+    on_bytes: Callable[[int], None],
+):
+    """
+    [first_chunk, first_chunk + chunk_count) chunks shared media session pe
+    raw GetFile se laa ke file ke sahi offset pe likhta hai. Beech me toote
+    to jitna aa chuka hai uske aage se retry.
+    """
+    done = 0
+    for attempt in range(RANGE_RETRIES + 1):
+        try:
+            with open(path, "r+b") as f:
+                while done < expected:
+                    offset = first_chunk * CHUNK + done
+                    f.seek(offset)
+                    r = await session.invoke(
+                        raw.functions.upload.GetFile(location=location, offset=offset, limit=CHUNK),
+                        sleep_threshold=30,
+                    )
+                    if not isinstance(r, raw.types.upload.File):
+                        raise _NotDirect("CDN redirect")
+                    if not r.bytes:
+                        break
+                    f.write(r.bytes)
+                    done += len(r.bytes)
+                    on_bytes(len(r.bytes))
+            if done < expected:
+                raise _ShortRead(f"Range {first_chunk}: {done}/{expected} bytes")
+            return
+        except (asyncio.CancelledError, _NotDirect):
+            raise
+        except Exception:
+            if attempt >= RANGE_RETRIES:
+                raise
+            await asyncio.sleep(2 ** attempt)
+
+
+async def _single_stream(
+    client: Client,
+    media,
+    final_path: str,
+    progress: Optional[Callable],
+    progress_args: tuple,
+    cancel_check: Optional[Callable[[], bool]],
+) -> Optional[str]:
+    """Normal download_media; cancel pe pyrogram ka stop_transmission."""
+
+    async def _progress(current: int, total: int, *args):
+        if cancel_check and cancel_check():
+            client.stop_transmission()
+        if progress:
+            await progress(current, total, *args)
+
+    path = await client.download_media(
+        media,
+        file_name=final_path,
+        progress=_progress,
+        progress_args=progress_args,
+    )
+    if path is None and cancel_check and cancel_check():
+        raise DownloadCancelled("Download cancelled by user.")
+    return path
+
+
+async def download_media_parallel(
+    client: Client,
+    media,
+    dest_dir: str,
+    file_name: Optional[str] = None,
+    progress: Optional[Callable] = None,
+    progress_args: tuple = (),
+    parts: Optional[int] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+) -> Optional[str]:
+    """
+    Badi Telegram file ko N parallel ranges me (ek shared media session per
+    DC, raw upload.GetFile offsets) preallocated file me download karta hai.
+    Chhoti file / CDN / error pe normal download_media.
+    cancel_check() True ho to ranges cancel + DownloadCancelled.
+    Returns final path (dest_dir/file_name).
+    """
+    size = getattr(media, "file_size", 0) or 0
+    name = file_name or getattr(media, "file_name", None) or getattr(media, "file_unique_id", "file")
+    os.makedirs(dest_dir, exist_ok=True)
+    final_path = os.path.join(dest_dir, os.path.basename(name))
+
+    parts = max(1, parts or Config.TG_DOWNLOAD_PARTS)
+    if parts == 1 or size < Config.TG_PARALLEL_MIN_MB * 1024 * 1024:
+        return await _single_stream(client, media, final_path, progress, progress_args, cancel_check)
+
+    try:
+        dc_id, location = _location(media)
+        session = await _media_session(client, dc_id)
+    except Exception:
+        return await _single_stream(client, media, final_path, progress, progress_args, cancel_check)
+
+    temp_path = final_path + ".temp"
+    with open(temp_path, "wb") as f:
+        f.truncate(size)
+
+    total_chunks = math.ceil(size / CHUNK)
+    per_part = math.ceil(total_chunks / parts)
+    downloaded = 0
+
+    def on_bytes(n: int):
+        nonlocal downloaded
+        downloaded += n
+
+    jobs = []
+    for first in range(0, total_chunks, per_part):
+        count = min(per_part, total_chunks - first)
+        expected = min(count * CHUNK, size - first * CHUNK)
+        jobs.append(
+            asyncio.create_task(
+                _fetch_range(session, location, temp_path, first, count, expected, on_bytes)
+            )
+        )
+
+    try:
+        pending = set(jobs)
+        while pending:
+            if cancel_check and cancel_check():
+                raise DownloadCancelled("Download cancelled by user.")
+            done, pending = await asyncio.wait(pending, timeout=1)
+            for t in done:
+                t.result()  # range fail -> yahi raise
+            if progress:
+                try:
+                    await progress(min(downloaded, size), size, *progress_args)
+                except Exception:
+                    pass
+    except (asyncio.CancelledError, DownloadCancelled):
+        await _abort(jobs, temp_path)
+        raise
+    except Exception:
+        await _abort(jobs, temp_path)
+        # parallel path nahi chala (CDN redirect / session issue) -> single stream
+        return await _single_stream(client, media, final_path, progress, progress_args, cancel_check)
+
+    os.replace(temp_path, final_path)
+    return final_path
+
+
+async def _abort(jobs, temp_path: str):
+    for t in jobs:
+        if not t.done():
+            t.cancel()
+    # ranges ruk jaye tab hi temp file hatao (warna open handle pe likhte rehte)
+    await asyncio.gather(*jobs, return_exceptions=True)
+    try:
+        os.remove(temp_path)
+    except OSError:
+        pass
@@ -0,0 +1,157 @@
+# utils/upload_pool.py
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from pyrogram.errors import FloodWait
+
+# itne consecutive success ke baad ek worker wapas on
+RECOVER_AFTER = 10
+MAX_FLOOD_RETRIES = 5
+
+
+class UploadPool:
+    """
+    Concurrent upload workers + ordered commit.
+
+    upload(item) workers me parallel chalta hai (FloodWait pe poora pool
+    pause hota hai aur active workers ek kam ho jate hain),
+    commit(item, result) hamesha input order me chalta hai, taaki
+    user ko messages sahi sequence me dikhe.
+    """
+
+    def __init__(self, workers: int):
+        self.max_workers = max(1, workers)
+        self.limit = self.max_workers
+        self._resume_at = 0.0
+        self._streak = 0
+        self.sent = 0
+        self.failed = 0
+        self._draining = False
+
+    async def _wait_pause(self):
+        # FloodWait pause: sab ruk jate hain
+        while True:
+            delay = self._resume_at - time.time()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def _wait_slot(self, idx: int):
+        # adaptive limit: idx >= limit wale workers naya item na uthaye.
+        # Item haath me lekar wait nahi (warna kam files pe limit kabhi wapas
+        # nahi badhta aur wo item atak jata); producer khatam ho to sab drain.
+        while idx >= self.limit and not self._draining:
+            await asyncio.sleep(1)
+
+    def _on_flood(self, seconds: float):
+        self._resume_at = max(self._resume_at, time.time() + seconds + 1)
+        self.limit = max(1, self.limit - 1)
+        self._streak = 0
+
+    def _on_success(self):
+        self._streak += 1
+        if self._streak >= RECOVER_AFTER and self.limit < self.max_workers:
+            self.limit += 1
+            self._streak = 0
+
+    async def call(self, idx: int, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """factory() ko FloodWait retry/backoff ke saath chalata hai."""
+        for _ in range(MAX_FLOOD_RETRIES):
+            await self._wait_pause()
+            try:
+                result = await factory()
+            except FloodWait as e:
+                self._on_flood(float(e.value or 1))
+                continue
+            self._on_success()
+            return result
+        raise RuntimeError("Too many FloodWait retries.")
+
+    async def run(
+        self,
+        items: AsyncIterator[Any],
+        upload: Callable[[Any], Awaitable[Any]],
+        commit: Callable[[Any, Any], Awaitable[Any]],
+        should_stop: Optional[Callable[[], bool]] = None,
+        on_done: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+        on_done(item) har item ke final upload result ke baad (success ya
+        fail) ek hi baar chalta hai, FloodWait retries ke beech nahi;
+        cleanup (file delete) yahi karo, upload() ke andar nahi.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_workers)
+        results: Dict[int, Any] = {}
+        ready = asyncio.Condition()
+        failed = object()
+        total_seq = None
+
+        async def producer():
+            nonlocal total_seq
+            seq = 0
+            try:
+                async for item in items:
+                    if should_stop and should_stop():
+                        break
+                    await queue.put((seq, item))
+                    seq += 1
+            finally:
+                total_seq = seq
+                self._draining = True
+                for _ in range(self.max_workers):
+                    await queue.put(None)
+                async with ready:
+                    ready.notify_all()
+
+        async def worker(idx: int):
+            while True:
+                await self._wait_slot(idx)
+                job = await queue.get()
+                if job is None:
+                    return
+                seq, item = job
+                try:
+                    res = await self.call(idx, lambda: upload(item))
+                except Exception:
+                    res = failed
+                finally:
+                    if on_done:
+                        try:
+                            on_done(item)
+                        except Exception:
+                            pass
+                async with ready:
+                    results[seq] = (item, res)
+                    ready.notify_all()
+
+        async def committer():
+            seq = 0
+            while True:
+                async with ready:
+                    await ready.wait_for(
+                        lambda: seq in results or (total_seq is not None and seq >= total_seq)
+                    )
+                    if seq not in results:
+                        return
+                    item, res = results.pop(seq)
+                if res is failed:
+                    self.failed += 1
+                else:
+                    try:
+                        await self.call(0, lambda: commit(item, res))
+                        self.sent += 1
+                    except Exception:
+                        self.failed += 1
+                seq += 1
+
+        prod = asyncio.create_task(producer())
+        workers = [asyncio.create_task(worker(i)) for i in range(self.max_workers)]
+        comm = asyncio.create_task(committer())
+        try:
+            await asyncio.gather(prod, *workers, comm)
+        finally:
+            # producer / worker fail hua to committer missing seq ka wait na kare
+            for t in [prod, *workers, comm]:
+                if not t.done():
+                    t.cancel()